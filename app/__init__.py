@@ -1,8 +1,11 @@
 from flask import Flask
 from flask_login import LoginManager
 
-from app.extensions import db, migrate, csrf
+from app.extensions import db, migrate, csrf, cache
 from app.blueprints import register_blueprints
+from app.cli import register_commands
+from app.services.images import register_image_helpers
+from app.services.versions import ensure_versions, register_version_tracking
 from app.models import User
 
 
@@ -14,6 +17,7 @@ def create_app(config_object="app.core.config"):
     db.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
+    cache.init_app(app)
 
     # Initialize Flask-Login
     login_manager = LoginManager()
@@ -25,11 +29,24 @@ def create_app(config_object="app.core.config"):
     def load_user(user_id):
         return User.query.get(int(user_id))
 
+    register_version_tracking()
+
     with app.app_context():
         from app import models
 
         db.create_all()
 
+        from app.services.search import ensure_search_index
+        from app.services.autocomplete import ensure_ingredient_index
+        from app.services.timeline import ensure_timeline
+
+        ensure_search_index()
+        ensure_ingredient_index()
+        ensure_timeline()
+        ensure_versions()
+
     # Register blueprints
     register_blueprints(app)
+    register_commands(app)
+    register_image_helpers(app)
     return app
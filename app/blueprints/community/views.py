@@ -1,21 +1,34 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from sqlalchemy.orm import joinedload
 from app.extensions import db
 from app.models.recipe import Recipe
 from app.models.comment import Comment
 from app.models.post import Post
 from app.models.image import Image
-from app.models.category import Category
 from app.blueprints.community.forms import PostForm, CommentForm
 from app.services.upload import upload_service
+from app.services.timeline import POST, RECIPE, feed_page, publish
+from app.services.versions import AUTHORS, CATALOGUE, TIMELINE, version_validators
+from app.services.counters import increment, recount
+from app.services.images import generate_variants, image_url
+from app.utils.http import conditional
 
 
 community_bp = Blueprint("community", __name__, url_prefix="/feed")
 
+# Cards rendered with the page; the rest is fetched from feed_items()
+FIRST_SCREEN_SIZE = 12
+FEED_PAGE_SIZE = 20
+
+
+def _feed_validators():
+    # Recipe rows carry the comment counters shown on the cards
+    return version_validators(TIMELINE, CATALOGUE, AUTHORS)
+
 
 @community_bp.route("/", methods=["GET", "POST"])
 @login_required
+@conditional(_feed_validators)
 def feed():
     post_form = PostForm()
     comment_form = CommentForm()
@@ -33,8 +46,10 @@ def feed():
                 )
                 db.session.add(post)
                 db.session.flush()  # Get the post ID
+                publish(POST, post.id, post.created_at)
                 
                 # Handle image uploads
+                new_images = []
                 uploaded_files = request.files.getlist('images')
                 if uploaded_files:
                     for file_field in uploaded_files:
@@ -44,11 +59,14 @@ def feed():
                                 if ok and url:
                                     image = Image(url=url, post_id=post.id)
                                     db.session.add(image)
+                                    new_images.append(image)
                             except Exception as e:
                                 print(f"Error uploading image: {str(e)}")
                                 continue
-                
+
+                recount(Post, post.id, "image_count")
                 db.session.commit()
+                generate_variants(new_images)
                 flash("Post created!", "success")
                 return redirect(url_for("community.feed"))
             except Exception as e:
@@ -66,6 +84,7 @@ def feed():
                     recipe_id = int(recipe_id)
                     c = Comment(content=comment_form.comment_text.data, user_id=current_user.id, recipe_id=recipe_id)
                     db.session.add(c)
+                    increment(Recipe, recipe_id, "comment_count")
                     db.session.commit()
                     flash("Comment posted", "success")
                 except Exception as e:
@@ -73,26 +92,65 @@ def feed():
                     flash("Failed to post comment", "error")
             return redirect(url_for("community.feed"))
 
-    recipes = (
-        Recipe.query
-        .options(
-            joinedload(Recipe.images),
-            joinedload(Recipe.comments).joinedload(Comment.author),
-            joinedload(Recipe.author),
-            joinedload(Recipe.category)
-        )
-        .filter(Recipe.public == True)
-        .order_by(Recipe.created_at.desc())
-        .limit(20)
-        .all()
-    )
-    posts = (
-        Post.query
-        .options(joinedload(Post.images), joinedload(Post.author))
-        .filter(Post.status == "published")
-        .order_by(Post.created_at.desc())
-        .limit(20)
-        .all()
+    # Failed submissions were flashed; never re-render the feed for a POST
+    if request.method == "POST":
+        return redirect(url_for("community.feed"))
+
+    page = feed_page(per_page=FIRST_SCREEN_SIZE)
+    recipes = [item for item in page.items if isinstance(item, Recipe)]
+    posts = [item for item in page.items if isinstance(item, Post)]
+    return render_template(
+        "community/feed.html",
+        feed_items=page.items,
+        next_cursor=page.next_cursor,
+        recipes=recipes,
+        posts=posts,
+        post_form=post_form,
+        comment_form=comment_form,
     )
-    return render_template("community/feed.html", recipes=recipes, posts=posts, post_form=post_form, comment_form=comment_form)
 
+
+def _excerpt(text, length):
+    text = text or ""
+    return text[:length] + "…" if len(text) > length else text
+
+
+def _serialize(item):
+    if isinstance(item, Recipe):
+        return {
+            "kind": RECIPE,
+            "id": item.id,
+            "title": item.name,
+            "text": _excerpt(item.description, 200),
+            "category": item.category.name if item.category else None,
+            "url": url_for("dashboard.view_recipe", recipe_id=item.id),
+            "image": image_url(item.images[0], 640) if item.images else None,
+            "image_count": item.image_count,
+            "author": item.author.name if item.author else None,
+            "comment_count": item.comment_count,
+            "created_at": item.created_at.isoformat() if item.created_at else None,
+        }
+    return {
+        "kind": POST,
+        "id": item.id,
+        "title": item.title,
+        "text": _excerpt(item.content, 320),
+        "category": None,
+        "url": None,
+        "image": image_url(item.images[0], 640) if item.images else None,
+        "image_count": item.image_count,
+        "author": item.author.name if item.author else None,
+        "comment_count": item.comment_count,
+        "created_at": item.created_at.isoformat() if item.created_at else None,
+    }
+
+
+@community_bp.route("/api/items")
+@login_required
+def feed_items():
+    """The next slice of the feed after ?cursor=, as compact JSON items."""
+    page = feed_page(request.args.get("cursor"), FEED_PAGE_SIZE, compact=True)
+    return jsonify(
+        items=[_serialize(item) for item in page.items],
+        next_cursor=page.next_cursor,
+    )
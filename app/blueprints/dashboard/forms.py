@@ -1,8 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, BooleanField, SelectField, FileField, SubmitField, FieldList, FormField, IntegerField, FloatField, MultipleFileField
 from wtforms.validators import DataRequired, Length, Optional
-from app.models.category import Category
-from app.models.origin import Origin
+from app.services.reference_data import reference_data
 
 
 class IngredientForm(FlaskForm):
@@ -36,8 +35,8 @@ class RecipeForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.category_id.choices = [(0, '-- Select Category --')] + [(c.id, c.name) for c in Category.query.all()]
-        self.origin_id.choices = [(0, '-- Select Origin --')] + [(o.id, o.country) for o in Origin.query.all()]
+        self.category_id.choices = reference_data.category_choices()
+        self.origin_id.choices = reference_data.origin_choices()
 
 class SettingsForm(FlaskForm):
     name = StringField("Name", validators=[DataRequired(), Length(min=3, max=150)])
@@ -1,23 +1,96 @@
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app.models.recipe import Recipe
-from app.models.category import Category
-from app.models.origin import Origin
 from app.models.user import User
 from app.models.post import Post
 from app.models.comment import Comment
 from app.extensions import db
-from sqlalchemy import or_, desc, func, case
+from sqlalchemy import desc
 from app.blueprints.dashboard.forms import RecipeForm, CommentForm, SettingsForm
 from app.models.step import Step
 from app.models.ingredients import Ingredient
 from app.models.image import Image
 from app.models.video import Video
 from app.services.upload import upload_service
+from app.services.search import index_recipe, remove_recipe, search_recipes
+from app.services.autocomplete import record_ingredients, forget_ingredients, search_terms
+from app.services.recommendations import recipe_sampler
+from app.services.nutrition import refresh_recipe_macros
+from app.services.units import apply_base_quantity
+from app.services.timeline import RECIPE, retract, sync_recipe
+from app.services.counters import increment, recount
+from app.services.images import generate_variants
+from app.repository.recipe import (
+    recipe_sort, get_recipe_aggregate_or_404, recipe_form_options, category_recipe_counts,
+    public_recipe_count, recipe_validators, catalogue_validators,
+)
+from app.services.reference_data import reference_data
+from app.utils.pagination import keyset_paginate, keyset_requested
+from app.utils.http import conditional
+from collections import defaultdict
 from datetime import datetime
 
 dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/dashboard")
 
+
+def _step_and_ingredient_images(recipe_id):
+    """Images attached to the steps and ingredients of a recipe."""
+    return Image.query.filter(
+        Image.ingredient_id.in_(db.session.query(Ingredient.id).filter_by(recipe_id=recipe_id))
+        | Image.step_id.in_(db.session.query(Step.id).filter_by(recipe_id=recipe_id))
+    )
+
+
+def _detach_child_images(recipe_id):
+    """Unlink step and ingredient images from rows the edit form recreates.
+
+    Returns ``{key: [image_id]}`` keyed by ``("ingredient", name)`` or
+    ``("step", step_number)`` for ``_reattach_child_images``.
+    """
+    detached = defaultdict(list)
+    ingredient_images = (
+        db.session.query(Image.id, Ingredient.name)
+        .join(Ingredient, Image.ingredient_id == Ingredient.id)
+        .filter(Ingredient.recipe_id == recipe_id)
+    )
+    for image_id, name in ingredient_images:
+        detached[("ingredient", (name or "").strip().lower())].append(image_id)
+    step_images = (
+        db.session.query(Image.id, Step.step_number)
+        .join(Step, Image.step_id == Step.id)
+        .filter(Step.recipe_id == recipe_id)
+    )
+    for image_id, step_number in step_images:
+        detached[("step", step_number)].append(image_id)
+    image_ids = [image_id for ids in detached.values() for image_id in ids]
+    if image_ids:
+        Image.query.filter(Image.id.in_(image_ids)).update(
+            {"ingredient_id": None, "step_id": None}, synchronize_session=False
+        )
+    return detached
+
+
+def _reattach_child_images(detached, ingredients, steps):
+    """Link detached images to the recreated ingredient of the same name or
+    step of the same number (rows must be flushed). Images whose ingredient
+    or step was removed are deleted; returns their URLs to release.
+    """
+    for ingredient in ingredients:
+        image_ids = detached.pop(("ingredient", ingredient.name.lower()), None)
+        if image_ids:
+            Image.query.filter(Image.id.in_(image_ids)).update(
+                {"ingredient_id": ingredient.id}, synchronize_session=False
+            )
+    for step in steps:
+        image_ids = detached.pop(("step", step.step_number), None)
+        if image_ids:
+            Image.query.filter(Image.id.in_(image_ids)).update({"step_id": step.id}, synchronize_session=False)
+    removed = Image.query.filter(Image.id.in_([image_id for ids in detached.values() for image_id in ids]))
+    urls = [url for (url,) in removed.with_entities(Image.url)]
+    removed.delete(synchronize_session=False)
+    return urls
+
+
 @dashboard_bp.route("/")
 @login_required
 def index():
@@ -28,12 +101,13 @@ def index():
     recent_recipes = Recipe.query.filter(Recipe.user_id != current_user.id, Recipe.public == True).order_by(desc(Recipe.created_at)).limit(12).all()
 
     # Get categories for filtering
-    categories = Category.query.all()
-    origins = Origin.query.all()
+    categories = reference_data.categories
+    origins = reference_data.origins
+    category_counts = category_recipe_counts()
 
     # Get stats
     total_recipes = Recipe.query.filter_by(user_id=current_user.id).count()
-    total_public_recipes = Recipe.query.filter_by(public=True).count()
+    total_public_recipes = public_recipe_count()
 
     # Get current hour for greeting
     current_hour = datetime.now().hour
@@ -42,14 +116,15 @@ def index():
     recent_posts = Post.query.order_by(desc(Post.created_at)).limit(5).all()
     recent_comments = Comment.query.order_by(desc(Comment.created_at)).limit(5).all()
 
-    # Recommended recipes (simple version)
-    recommended_recipes = Recipe.query.filter(Recipe.public == True).order_by(db.func.random()).limit(4).all()
+    # Recommended recipes, sampled from the cached public id list
+    recommended_recipes = recipe_sampler.sample(4)
 
     return render_template("dashboard/index.html",
                          user_recipes=user_recipes,
                          recent_recipes=recent_recipes,
                          categories=categories,
                          origins=origins,
+                         category_counts=category_counts,
                          total_recipes=total_recipes,
                          total_public_recipes=total_public_recipes,
                          current_hour=current_hour,
@@ -76,30 +151,33 @@ def my_recipes():
     elif visibility == 'private':
         query = query.filter_by(public=False)
 
-    if sort_by == 'date_asc':
-        query = query.order_by(Recipe.created_at.asc())
-    elif sort_by == 'name_asc':
-        query = query.order_by(Recipe.name.asc())
-    elif sort_by == 'name_desc':
-        query = query.order_by(Recipe.name.desc())
+    sort_column, descending = recipe_sort(sort_by)
+    if keyset_requested():
+        recipes = keyset_paginate(query, sort_column, Recipe.id, descending, request.args.get('cursor'), per_page)
     else:
-        query = query.order_by(desc(Recipe.created_at))
-
-    recipes = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+        query = query.order_by(sort_column.desc() if descending else sort_column.asc())
+        recipes = query.paginate(
+            page=page, per_page=per_page, error_out=False
+        )
 
-    categories = Category.query.all()
+    categories = reference_data.categories
 
     return render_template("dashboard/my_recipes.html",
                          recipes=recipes,
                          categories=categories,
+                         category_counts=category_recipe_counts(),
                          current_category=category_id,
                          current_visibility=visibility,
                          current_sort_by=sort_by)
 
+def _explore_validators():
+    parts, last_modified = catalogue_validators()
+    return (parts, reference_data.version), last_modified
+
+
 @dashboard_bp.route("/explore")
 @login_required
+@conditional(_explore_validators)
 def explore():
     page = request.args.get('page', 1, type=int)
     category_param = request.args.get('category')
@@ -119,7 +197,7 @@ def explore():
             query = query.filter_by(category_id=category_id)
         except ValueError:
             # If not an integer, treat as category name
-            category = Category.query.filter_by(name=category_param).first()
+            category = reference_data.category_by_name(category_param)
             if category:
                 category_id = category.id
                 query = query.filter_by(category_id=category.id)
@@ -127,31 +205,37 @@ def explore():
     if origin_id:
         query = query.filter_by(origin_id=origin_id)
 
-    if search:
-        query = query.filter(or_(
-            Recipe.name.contains(search),
-            Recipe.description.contains(search)
-        ))
-
-    recipes = query.order_by(desc(Recipe.created_at)).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    if keyset_requested():
+        # Relevance has no stable key to seek on, so cursor mode stays newest-first
+        if search:
+            query = search_recipes(query, search, ranked=False)
+        recipes = keyset_paginate(query, Recipe.created_at, Recipe.id, True, request.args.get('cursor'), per_page)
+    else:
+        if search:
+            query = search_recipes(query, search)
+        else:
+            query = query.order_by(desc(Recipe.created_at))
+        recipes = query.paginate(
+            page=page, per_page=per_page, error_out=False
+        )
 
-    categories = Category.query.all()
-    origins = Origin.query.all()
+    categories = reference_data.categories
+    origins = reference_data.origins
 
     return render_template("dashboard/explore.html",
                          recipes=recipes,
                          categories=categories,
                          origins=origins,
+                         category_counts=category_recipe_counts(),
                          current_category=category_id,
                          current_origin=origin_id,
                          current_search=search)
 
 @dashboard_bp.route("/recipe/<int:recipe_id>")
 @login_required
+@conditional(lambda recipe_id: recipe_validators(recipe_id, current_user.id))
 def view_recipe(recipe_id):
-    recipe = Recipe.query.get_or_404(recipe_id)
+    recipe = get_recipe_aggregate_or_404(recipe_id)
     form = CommentForm(obj=None)
 
     # Check if user can view this recipe
@@ -186,9 +270,12 @@ def add_recipe():
 
             db.session.add(recipe)
             db.session.flush()  # Get the recipe ID
+            index_recipe(recipe)
+            sync_recipe(recipe)
 
             # Handle recipe images - process directly from request.files
             uploaded_images = []
+            new_images = []
             print(f"DEBUG: form.recipe_images.data = {form.recipe_images.data}")
             print(f"DEBUG: request.files = {request.files}")
 
@@ -224,6 +311,7 @@ def add_recipe():
                             if ok and url:
                                 image = Image(url=url, recipe_id=recipe.id)
                                 db.session.add(image)
+                                new_images.append(image)
                                 uploaded_images.append(url)
                                 print(f"DEBUG: Added image to database: {url}")
                             else:
@@ -236,6 +324,7 @@ def add_recipe():
                 flash("No images were uploaded. You can add images later by editing your recipe.", "warning")
 
             # Handle ingredients
+            new_ingredients = []
             for ingredient_field in form.ingredients:
                 if ingredient_field.form.name.data:
                     ingredient = Ingredient(
@@ -246,8 +335,10 @@ def add_recipe():
                         recipe_id=recipe.id,
                         user_id=current_user.id
                     )
+                    apply_base_quantity(ingredient)
                     db.session.add(ingredient)
                     db.session.flush()  # Get ingredient ID
+                    new_ingredients.append(ingredient)
 
                     # Handle ingredient images - process directly from request.files
                     ingredient_idx = len([i for i in form.ingredients if i.form.name.data]) - 1
@@ -259,10 +350,14 @@ def add_recipe():
                                 if ok and url:
                                     image = Image(url=url, ingredient_id=ingredient.id)
                                     db.session.add(image)
+                                    new_images.append(image)
                                     print(f"DEBUG: Added ingredient image: {url}")
                             except Exception as e:
                                 flash(f"Error uploading ingredient image: {str(e)}", "error")
 
+            record_ingredients(new_ingredients, current_user.id)
+            refresh_recipe_macros(recipe, new_ingredients)
+
             # Handle steps
             for step_field in form.steps:
                 if step_field.form.instruction.data:
@@ -287,6 +382,7 @@ def add_recipe():
                                 if ok and url:
                                     image = Image(url=url, step_id=step.id)
                                     db.session.add(image)
+                                    new_images.append(image)
                                     print(f"DEBUG: Added step image: {url}")
                             except Exception as e:
                                 flash(f"Error uploading step image: {str(e)}", "error")
@@ -294,6 +390,7 @@ def add_recipe():
             # Handle video - YouTube or Upload
             youtube_embed_id = request.form.get('youtube_embed_id', '').strip()
             recipe_video_file = request.files.get('recipe_video')
+            video_upload_id = request.form.get('recipe_video_upload', '').strip()
 
             if youtube_embed_id:
                 # Save YouTube video
@@ -305,6 +402,13 @@ def add_recipe():
                 )
                 db.session.add(video)
                 print(f"DEBUG: Added YouTube video: {youtube_url}")
+            elif video_upload_id:
+                # Uploaded beforehand through /upload-sessions
+                url = upload_service.claim_upload(video_upload_id, current_user.id)
+                if url:
+                    db.session.add(Video(video_url=url, is_main=True, recipe_id=recipe.id))
+                else:
+                    flash("The uploaded video could not be found. Please upload it again.", "error")
             elif recipe_video_file and recipe_video_file.filename:
                 # Handle video upload
                 allowed_video_extensions = {'mp4', 'webm', 'mov', 'avi', 'quicktime'}
@@ -337,7 +441,9 @@ def add_recipe():
                             print(f"DEBUG: Exception during video upload: {str(e)}")
                             flash(f"Error uploading video: {str(e)}", "error")
 
+            recount(Recipe, recipe.id)
             db.session.commit()
+            generate_variants(new_images)
             flash("Recipe created successfully!", "success")
             return redirect(url_for("dashboard.my_recipes"))
 
@@ -372,7 +478,7 @@ def settings():
 @dashboard_bp.route("/recipe/<int:recipe_id>/edit", methods=["GET", "POST"])
 @login_required
 def edit_recipe(recipe_id):
-    recipe = Recipe.query.get_or_404(recipe_id)
+    recipe = get_recipe_aggregate_or_404(recipe_id, recipe_form_options())
     if recipe.user_id != current_user.id:
         return render_template("dashboard/error.html", message="You are not authorized to edit this recipe."), 403
 
@@ -385,18 +491,33 @@ def edit_recipe(recipe_id):
             recipe.public = form.public.data
             recipe.category_id = form.category_id.data if form.category_id.data != 0 else None
             recipe.origin_id = form.origin_id.data if form.origin_id.data != 0 else None
+            index_recipe(recipe)
+            sync_recipe(recipe)
 
             # Clear existing ingredients and steps
+            forget_ingredients(
+                db.session.query(Ingredient.name, Ingredient.unit, Ingredient.public).filter_by(recipe_id=recipe.id).all(),
+                current_user.id
+            )
+            # The form doesn't resend their images: keep them for the recreated rows
+            detached_images = _detach_child_images(recipe.id)
+            replaced_media = []
             Ingredient.query.filter_by(recipe_id=recipe.id).delete()
             Step.query.filter_by(recipe_id=recipe.id).delete()
 
             # Handle main recipe image (optional)
-            if form.recipe_image.data:
-                ok, url = upload_service.upload_file(form.recipe_image.data)
+            new_images = []
+            for file_field in request.files.getlist('recipe_images'):
+                if not (file_field and file_field.filename):
+                    continue
+                ok, url = upload_service.upload_file(file_field)
                 if ok and url:
-                    # Remove old image if it exists
-                    Image.query.filter_by(recipe_id=recipe.id).delete()
-                    db.session.add(Image(url=url, recipe_id=recipe.id))
+                    if not new_images:
+                        # New images replace the old ones
+                        replaced_media += [image.url for image in recipe.images]
+                        Image.query.filter_by(recipe_id=recipe.id).delete()
+                    new_images.append(Image(url=url, recipe_id=recipe.id))
+                    db.session.add(new_images[-1])
 
             # Parse ingredients from request
             ingredient_names = request.form.getlist('ingredient_names[]')
@@ -404,6 +525,7 @@ def edit_recipe(recipe_id):
             ingredient_units = request.form.getlist('ingredient_units[]')
             ingredient_notes = request.form.getlist('ingredient_notes[]')
 
+            new_ingredients = []
             for i, name in enumerate(ingredient_names):
                 if name.strip():  # Only add if name is provided
                     ingredient = Ingredient(
@@ -414,7 +536,11 @@ def edit_recipe(recipe_id):
                         recipe_id=recipe.id,
                         user_id=current_user.id
                     )
+                    apply_base_quantity(ingredient)
                     db.session.add(ingredient)
+                    new_ingredients.append(ingredient)
+            record_ingredients(new_ingredients, current_user.id)
+            refresh_recipe_macros(recipe, new_ingredients)
 
             # Parse steps from request
             step_numbers = request.form.getlist('step_numbers[]')
@@ -423,6 +549,7 @@ def edit_recipe(recipe_id):
             step_durations = request.form.getlist('step_durations[]')
             step_descriptions = request.form.getlist('step_descriptions[]')
 
+            new_steps = []
             for i, instruction in enumerate(step_instructions):
                 if instruction.strip():  # Only add if instruction is provided
                     step = Step(
@@ -434,23 +561,32 @@ def edit_recipe(recipe_id):
                         recipe_id=recipe.id
                     )
                     db.session.add(step)
+                    new_steps.append(step)
 
-            # Handle video - YouTube or Upload
-            # Clear existing videos first
-            Video.query.filter_by(recipe_id=recipe.id).delete()
+            db.session.flush()
+            replaced_media += _reattach_child_images(detached_images, new_ingredients, new_steps)
 
+            # Handle video - YouTube or Upload; the current video stays unless a new one is given
+            new_video = None
             youtube_embed_id = request.form.get('youtube_embed_id', '').strip()
             recipe_video_file = request.files.get('recipe_video')
+            video_upload_id = request.form.get('recipe_video_upload', '').strip()
 
             if youtube_embed_id:
                 # Save YouTube video
                 youtube_url = f"https://www.youtube.com/embed/{youtube_embed_id}"
-                video = Video(
+                new_video = Video(
                     video_url=youtube_url,
                     is_main=True,
                     recipe_id=recipe.id
                 )
-                db.session.add(video)
+            elif video_upload_id:
+                # Uploaded beforehand through /upload-sessions
+                url = upload_service.claim_upload(video_upload_id, current_user.id)
+                if url:
+                    new_video = Video(video_url=url, is_main=True, recipe_id=recipe.id)
+                else:
+                    flash("The uploaded video could not be found. Please upload it again.", "error")
             elif recipe_video_file and recipe_video_file.filename:
                 # Handle video upload
                 allowed_video_extensions = {'mp4', 'webm', 'mov', 'avi', 'quicktime'}
@@ -466,16 +602,25 @@ def edit_recipe(recipe_id):
                         try:
                             ok, url = upload_service.upload_file(recipe_video_file)
                             if ok and url:
-                                video = Video(
+                                new_video = Video(
                                     video_url=url,
                                     is_main=True,
                                     recipe_id=recipe.id
                                 )
-                                db.session.add(video)
                         except Exception as e:
                             flash(f"Error uploading video: {str(e)}", "error")
 
+            current_videos = [video.video_url for video in recipe.videos]
+            if new_video is not None and new_video.video_url not in current_videos:
+                replaced_media += current_videos
+                Video.query.filter_by(recipe_id=recipe.id).delete()
+                db.session.add(new_video)
+
+            recount(Recipe, recipe.id, "image_count", "step_count", "ingredient_count")
             db.session.commit()
+            generate_variants(new_images)
+            for url in replaced_media:
+                upload_service.delete_file(url)
             flash("Recipe updated successfully!", "success")
             return redirect(url_for("dashboard.my_recipes"))
 
@@ -492,8 +637,25 @@ def delete_recipe(recipe_id):
     if recipe.user_id != current_user.id:
         return render_template("dashboard/error.html", message="You are not authorized to delete this recipe."), 403
 
+    child_images = _step_and_ingredient_images(recipe.id)
+    media = [image.url for image in recipe.images] + [video.video_url for video in recipe.videos]
+    media += [url for (url,) in child_images.with_entities(Image.url)]
+    remove_recipe(recipe.id)
+    retract(RECIPE, recipe.id)
+    forget_ingredients(
+        db.session.query(Ingredient.name, Ingredient.unit, Ingredient.public).filter_by(recipe_id=recipe.id).all(),
+        current_user.id
+    )
+    child_images.delete(synchronize_session=False)
+    Ingredient.query.filter_by(recipe_id=recipe.id).delete()
+    Step.query.filter_by(recipe_id=recipe.id).delete()
+    Image.query.filter_by(recipe_id=recipe.id).delete()
+    Video.query.filter_by(recipe_id=recipe.id).delete()
     db.session.delete(recipe)
     db.session.commit()
+    # Blobs shared with other recipes or posts stay
+    for url in media:
+        upload_service.delete_file(url)
     flash("Recipe deleted successfully!", "success")
     return redirect(url_for("dashboard.my_recipes"))
 
@@ -504,6 +666,7 @@ def add_comment(recipe_id):
     if form.validate_on_submit():
         comment = Comment(content=form.comment_text.data, recipe_id=recipe_id, user_id=current_user.id)
         db.session.add(comment)
+        increment(Recipe, recipe_id, "comment_count")
         db.session.commit()
         flash("Comment posted!", "success")
     else:
@@ -519,26 +682,8 @@ def search_ingredients():
     if not query:
         return jsonify([])
 
-    # Search ingredients by name, prioritizing user's own ingredients
-    ingredients = db.session.query(
-        Ingredient.name,
-        Ingredient.unit,
-        func.count(Ingredient.id).label('usage_count'),
-        func.max(Ingredient.created_at).label('last_used')
-    ).filter(
-        or_(
-            Ingredient.user_id == current_user.id,
-            Ingredient.public == True
-        ),
-        Ingredient.name.ilike(f'%{query}%')
-    ).group_by(
-        Ingredient.name, Ingredient.unit
-    ).order_by(
-        # Prioritize user's own ingredients
-        func.max(case([(Ingredient.user_id == current_user.id, 1)], else_=0)).desc(),
-        func.count(Ingredient.id).desc(),  # Then by usage frequency
-        func.max(Ingredient.created_at).desc()  # Then by recency
-    ).limit(10).all()
+    # Search the autocomplete index, prioritizing user's own ingredients
+    ingredients = search_terms(query, current_user.id, limit=10)
 
     result = []
     for ingredient in ingredients:
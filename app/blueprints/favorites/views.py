@@ -2,10 +2,12 @@ from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
 from app.models.favorite import Favorite
 from app.models.recipe import Recipe
-from app.models.category import Category
 from app.models.origin import Origin
 from app.extensions import db
-from sqlalchemy import desc
+from app.services.counters import increment
+from app.services.reference_data import reference_data
+from app.repository.recipe import recipe_sort
+from app.utils.pagination import keyset_paginate, keyset_requested
 
 from . import favorites_bp
 
@@ -19,32 +21,24 @@ def index():
     category_id = request.args.get('category', type=int)
     sort_by = request.args.get('sort_by', 'date_desc')
 
-    # Get user's favorited recipe IDs
-    favorite_ids = db.session.query(Favorite.recipe_id).filter_by(user_id=current_user.id).all()
-    favorite_recipe_ids = [fav[0] for fav in favorite_ids]
-
-    # Query recipes that are in favorites
-    query = Recipe.query.filter(Recipe.id.in_(favorite_recipe_ids))
+    # Query recipes that are in the user's favorites
+    query = Recipe.query.join(Favorite, Favorite.recipe_id == Recipe.id).filter(Favorite.user_id == current_user.id)
+    favorite_count = Favorite.query.filter_by(user_id=current_user.id).count()
 
     # Apply filters
     if category_id:
-        query = query.filter_by(category_id=category_id)
-
-    # Apply sorting
-    if sort_by == 'date_asc':
-        query = query.order_by(Recipe.created_at.asc())
-    elif sort_by == 'name_asc':
-        query = query.order_by(Recipe.name.asc())
-    elif sort_by == 'name_desc':
-        query = query.order_by(Recipe.name.desc())
-    else:  # date_desc (default)
-        query = query.order_by(desc(Recipe.created_at))
+        query = query.filter(Recipe.category_id == category_id)
 
-    # Paginate
-    recipes = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Apply sorting and paginate
+    sort_column, descending = recipe_sort(sort_by)
+    if keyset_requested():
+        recipes = keyset_paginate(query, sort_column, Recipe.id, descending, request.args.get('cursor'), per_page)
+    else:
+        query = query.order_by(sort_column.desc() if descending else sort_column.asc())
+        recipes = query.paginate(page=page, per_page=per_page, error_out=False)
 
     # Get categories for filtering
-    categories = Category.query.all()
+    categories = reference_data.categories
 
     return render_template(
         "favorites/index.html",
@@ -52,7 +46,7 @@ def index():
         categories=categories,
         current_category=category_id,
         current_sort_by=sort_by,
-        favorite_count=len(favorite_recipe_ids)
+        favorite_count=favorite_count
     )
 
 
@@ -71,10 +65,12 @@ def toggle(recipe_id):
     if favorite:
         # Remove from favorites
         db.session.delete(favorite)
+        increment(Recipe, recipe_id, "favorite_count", -1)
         db.session.commit()
         return jsonify({
             'success': True,
             'favorited': False,
+            'favorite_count': recipe.favorite_count,
             'message': 'Recipe removed from favorites'
         })
     else:
@@ -84,10 +80,12 @@ def toggle(recipe_id):
             recipe_id=recipe_id
         )
         db.session.add(new_favorite)
+        increment(Recipe, recipe_id, "favorite_count")
         db.session.commit()
         return jsonify({
             'success': True,
             'favorited': True,
+            'favorite_count': recipe.favorite_count,
             'message': 'Recipe added to favorites'
         })
 
@@ -1,8 +1,17 @@
-from flask import Blueprint, render_template, send_from_directory, current_app
-from flask_login import login_required
+from flask import Blueprint, abort, current_app, jsonify, render_template, request
+from flask_login import current_user, login_required
+
+from app.extensions import db
+from app.models.upload_session import UploadSession
+from app.services.upload import UploadError, upload_service
 
 main_bp = Blueprint("main", __name__)
 
+# What each kind of resumable upload accepts
+UPLOAD_KINDS = {
+    "video": ({"mp4", "webm", "mov", "avi"}, 500 * 1024 * 1024),
+}
+
 
 @main_bp.route("/")
 def index():
@@ -12,4 +21,79 @@ def index():
 @main_bp.route("/uploads/<path:filename>")
 def uploaded_file(filename):
     """Serve user-uploaded files from the configured upload folder."""
-    return send_from_directory(current_app.config["UPLOAD_FOLDER"], filename)
+    return upload_service.serve(filename)
+
+
+def _session_json(session):
+    return jsonify({
+        "success": True,
+        "upload_id": session.id,
+        "size": session.size,
+        "offset": session.received,
+        "complete": session.complete,
+        "chunk_size": current_app.config["UPLOAD_CHUNK_SIZE"],
+    })
+
+
+def _own_session_or_404(upload_id, for_update=False):
+    # Writers lock the row so concurrent chunks can't both advance "received"
+    session = db.session.get(UploadSession, upload_id, with_for_update=for_update or None)
+    if session is None or session.user_id != current_user.id:
+        abort(404)
+    return session
+
+
+@main_bp.route("/upload-sessions", methods=["POST"])
+@login_required
+def create_upload_session():
+    """Start a resumable upload: ``{"filename", "size", "kind"}``."""
+    data = request.get_json(silent=True) or {}
+    kind = UPLOAD_KINDS.get(data.get("kind", "video"))
+    if kind is None:
+        return jsonify({"success": False, "message": "Unknown upload kind"}), 400
+    try:
+        session = upload_service.create_session(
+            current_user.id, data.get("filename", ""), int(data.get("size") or 0), *kind
+        )
+    except (UploadError, ValueError) as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    db.session.commit()
+    return _session_json(session), 201
+
+
+@main_bp.route("/upload-sessions/<upload_id>", methods=["GET"])
+@login_required
+def upload_session_status(upload_id):
+    """Where to resume: the number of bytes received so far."""
+    return _session_json(_own_session_or_404(upload_id))
+
+
+@main_bp.route("/upload-sessions/<upload_id>", methods=["PUT"])
+@login_required
+def upload_chunk(upload_id):
+    """Append the raw request body at the ``Upload-Offset`` header's byte offset."""
+    session = _own_session_or_404(upload_id, for_update=True)
+    offset = request.headers.get("Upload-Offset", type=int)
+    length = request.content_length
+    if offset is None or length is None:
+        return jsonify({"success": False, "message": "Upload-Offset and Content-Length are required"}), 400
+    try:
+        upload_service.write_chunk(session, offset, request.stream, length)
+    except UploadError as e:
+        # The current offset tells the client where to resume
+        return jsonify({"success": False, "message": str(e), "offset": session.received}), 409
+    db.session.commit()
+    return _session_json(session)
+
+
+@main_bp.route("/upload-sessions/<upload_id>/complete", methods=["POST"])
+@login_required
+def complete_upload_session(upload_id):
+    """Store the finished file; the form then submits ``upload_id``."""
+    session = _own_session_or_404(upload_id, for_update=True)
+    try:
+        upload_service.complete_session(session)
+    except UploadError as e:
+        return jsonify({"success": False, "message": str(e), "offset": session.received}), 409
+    db.session.commit()
+    return _session_json(session)
@@ -1,24 +1,37 @@
-from datetime import datetime, date
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from datetime import datetime, date, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app.extensions import db
 from app.models.meal import MealPlan, MealEntry
 from app.models.recipe import Recipe
 from app.models.ingredients import Ingredient
-from app.services.nutrition import estimate_recipe_macros, score_recipe_for_goal
+from app.services.nutrition import (
+    GOALS,
+    MACRO_COLUMNS,
+    load_recipe_macros,
+    planned_macro_totals,
+    top_recipes_for_goal,
+)
+from app.services.units import display_quantity
+from app.services.meal_planner import MacroTargets, generate_meal_plan
+from app.repository.meal import ensure_plans, get_plan_with_recipes, grocery_items, planned_entries, set_meals
+from app.services.search import search_recipes
+from app.utils.pagination import keyset_paginate
+from sqlalchemy.orm import selectinload
 from app.blueprints.planner.forms import MealPlannerForm
 
 
 planner_bp = Blueprint("planner", __name__, url_prefix="/planner")
 
+MEAL_TYPES = ("breakfast", "lunch", "dinner")
+MAX_GROCERY_DAYS = 93
+MAX_RANGE_DAYS = 31
+PICKER_PAGE_SIZE = 24
 
-def _get_or_create_plan(user_id: int, plan_date: date) -> MealPlan:
-    plan = MealPlan.query.filter_by(user_id=user_id, plan_date=plan_date).first()
-    if not plan:
-        plan = MealPlan(user_id=user_id, plan_date=plan_date)
-        db.session.add(plan)
-        db.session.commit()
-    return plan
+
+def _get_or_create_plan(user_id: int, plan_date: date) -> int:
+    """Id of the user's plan for *plan_date*, created if missing (caller commits)."""
+    return ensure_plans(user_id, [plan_date])[plan_date]
 
 
 @planner_bp.route("/", methods=["GET", "POST"])
@@ -33,12 +46,11 @@ def index():
 
     form = MealPlannerForm()
     if form.validate_on_submit():
-        plan = _get_or_create_plan(current_user.id, selected_date)
+        plan_id = _get_or_create_plan(current_user.id, selected_date)
         # Clear existing entries for simplicity
-        MealEntry.query.filter_by(meal_plan_id=plan.id).delete()
-        db.session.flush()
+        MealEntry.query.filter_by(meal_plan_id=plan_id).delete()
 
-        for meal_type in ["breakfast", "lunch", "dinner"]:
+        for meal_type in MEAL_TYPES:
             rid = request.form.get(meal_type + "_recipe_id")
             if rid:
                 try:
@@ -46,75 +58,239 @@ def index():
                 except ValueError:
                     rid = None
             if rid:
-                db.session.add(MealEntry(meal_plan_id=plan.id, meal_type=meal_type, recipe_id=rid))
+                db.session.add(MealEntry(meal_plan_id=plan_id, meal_type=meal_type, recipe_id=rid))
         db.session.commit()
         flash("Meal plan updated", "success")
         return redirect(url_for("planner.index", date=selected_date.isoformat()))
 
     # Load plan
-    plan = MealPlan.query.filter_by(user_id=current_user.id, plan_date=selected_date).first()
+    plan = get_plan_with_recipes(current_user.id, selected_date)
     entries = {e.meal_type: e for e in (plan.entries if plan else [])}
 
-    # Recipes for selection
-    recipes = Recipe.query.filter((Recipe.public == True) | (Recipe.user_id == current_user.id)).order_by(Recipe.name).all()
-
     # Nutrition totals
     totals = {"protein": 0.0, "carbs": 0.0, "fats": 0.0, "calories": 0.0}
-    selected_recipes = []
-    if plan:
-        for e in plan.entries:
-            r = Recipe.query.get(e.recipe_id)
-            if r:
-                selected_recipes.append((e.meal_type, r))
-                m = estimate_recipe_macros(r)
-                for k in totals:
-                    totals[k] += m[k]
+    selected_recipes = [(e.meal_type, e.recipe) for e in entries.values() if e.recipe]
+    macros = load_recipe_macros(r for _, r in selected_recipes)
+    for _, r in selected_recipes:
+        for k in totals:
+            totals[k] += macros[r.id][k]
 
     return render_template(
         "planner/index.html",
         selected_date=selected_date,
         entries=entries,
-        recipes=recipes,
         totals=totals,
         selected_recipes=selected_recipes,
         form=form,
     )
 
 
+def _parse_date(value, default: date) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else default
+    except ValueError:
+        return default
+
+
+def _plan_range(user_id: int, start: date, end: date) -> list:
+    """Every day from *start* to *end* with its meals and macro totals."""
+    days = {
+        start + timedelta(days=i): {"meals": {}, "totals": dict.fromkeys(MACRO_COLUMNS, 0.0)}
+        for i in range((end - start).days + 1)
+    }
+    for row in planned_entries(user_id, start, end):
+        days[row.plan_date]["meals"][row.meal_type] = {"id": row.recipe_id, "name": row.recipe_name}
+    for plan_date, totals in planned_macro_totals(user_id, start, end).items():
+        days[plan_date]["totals"] = totals
+    return [{"date": d.isoformat(), **day} for d, day in days.items()]
+
+
+@planner_bp.route("/range")
+@login_required
+def plan_range():
+    """Week (or any range up to MAX_RANGE_DAYS) of meals with daily totals."""
+    start = _parse_date(request.args.get("start"), date.today() - timedelta(days=date.today().weekday()))
+    end = _parse_date(request.args.get("end"), start + timedelta(days=6))
+    if end < start:
+        start, end = end, start
+    end = min(end, start + timedelta(days=MAX_RANGE_DAYS - 1))
+    span = timedelta(days=(end - start).days + 1)
+    return render_template(
+        "planner/range.html",
+        start_date=start,
+        end_date=end,
+        prev_range=(start - span, end - span),
+        next_range=(start + span, end + span),
+        meal_types=MEAL_TYPES,
+        days=_plan_range(current_user.id, start, end),
+    )
+
+
+def _json_field(obj, key, kind):
+    """``obj[key]`` of a JSON body, or an empty *kind*; ValueError on a wrong shape."""
+    if not isinstance(obj, dict):
+        raise ValueError("the body must be an object")
+    value = obj.get(key) or kind()
+    if not isinstance(value, kind):
+        raise ValueError(f'"{key}" must be {"a list" if kind is list else "an object"}')
+    return value
+
+
+@planner_bp.route("/api/plans", methods=["POST"])
+@login_required
+def bulk_upsert_plans():
+    """Set the meals of many days in one transaction.
+
+    Body: ``{"days": [{"date": "YYYY-MM-DD", "meals": {"lunch": 12, "dinner": null}}]}``.
+    Only the meal types given for a day are touched; ``null`` clears one.
+    Returns every day of the covered range with its macro totals.
+    """
+    payload = request.get_json(silent=True) or {}
+    slots = {}
+    try:
+        days = _json_field(payload, "days", list)
+        for day in days:
+            if not isinstance(day, dict):
+                raise ValueError("every day must be an object")
+            plan_date = datetime.strptime(day["date"], "%Y-%m-%d").date()
+            for meal_type, recipe_id in _json_field(day, "meals", dict).items():
+                if meal_type not in MEAL_TYPES:
+                    raise ValueError(f"Unknown meal type: {meal_type}")
+                slots[(plan_date, meal_type)] = int(recipe_id) if recipe_id is not None else None
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"success": False, "message": f"Invalid plan: {e}"}), 400
+    if not slots:
+        return jsonify({"success": False, "message": "No days given"}), 400
+
+    dates = sorted({d for d, _ in slots})
+    if (dates[-1] - dates[0]).days >= MAX_RANGE_DAYS:
+        return jsonify({"success": False, "message": f"At most {MAX_RANGE_DAYS} days at once"}), 400
+
+    recipe_ids = {rid for rid in slots.values() if rid is not None}
+    visible = {
+        row.id
+        for row in db.session.query(Recipe.id).filter(
+            Recipe.id.in_(recipe_ids), (Recipe.public == True) | (Recipe.user_id == current_user.id)
+        )
+    }
+    if recipe_ids - visible:
+        return jsonify({"success": False, "message": "Unknown recipe"}), 400
+
+    set_meals(current_user.id, slots)
+    db.session.commit()
+
+    return jsonify({"success": True, "days": _plan_range(current_user.id, dates[0], dates[-1])})
+
+
+@planner_bp.route("/api/generate", methods=["POST"])
+@login_required
+def generate_plan():
+    """Auto-fill a range of days towards daily macro targets.
+
+    Body: ``{"start": "YYYY-MM-DD", "end": "YYYY-MM-DD", "targets": {"calories": 2000,
+    "protein": 120}, "meal_types": ["lunch", "dinner"], "no_repeat_days": 3,
+    "overwrite": false}``. Writes the chosen meals in one commit and returns
+    the range like ``/api/plans`` does.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        if not isinstance(payload, dict):
+            raise ValueError("the body must be an object")
+        start = datetime.strptime(payload["start"], "%Y-%m-%d").date()
+        end = datetime.strptime(payload.get("end") or payload["start"], "%Y-%m-%d").date()
+        raw_targets = _json_field(payload, "targets", dict)
+        targets = MacroTargets(**{c: float(raw_targets[c]) for c in MACRO_COLUMNS if raw_targets.get(c)})
+        meal_types = [mt for mt in MEAL_TYPES if mt in (payload.get("meal_types") or MEAL_TYPES)]
+        no_repeat_days = int(payload.get("no_repeat_days", 3))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"success": False, "message": f"Invalid request: {e}"}), 400
+    if end < start:
+        start, end = end, start
+    if (end - start).days >= MAX_RANGE_DAYS:
+        return jsonify({"success": False, "message": f"At most {MAX_RANGE_DAYS} days at once"}), 400
+    if not targets:
+        return jsonify({"success": False, "message": "Set at least one target"}), 400
+
+    slots = generate_meal_plan(
+        current_user.id,
+        start,
+        end,
+        targets,
+        meal_types,
+        no_repeat_days=no_repeat_days,
+        overwrite=bool(payload.get("overwrite")),
+    )
+    set_meals(current_user.id, slots)
+    db.session.commit()
+    return jsonify({"success": True, "filled": len(slots), "days": _plan_range(current_user.id, start, end)})
+
+
 @planner_bp.route("/grocery-list")
 @login_required
 def grocery_list():
-    date_str = request.args.get("date")
-    selected_date = datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else date.today()
-    plan = MealPlan.query.filter_by(user_id=current_user.id, plan_date=selected_date).first()
-    items = {}
-    if plan:
-        for e in plan.entries:
-            r = Recipe.query.get(e.recipe_id)
-            if not r:
-                continue
-            for ing in r.ingredients:
-                key = (ing.name or "").strip().lower(), (ing.unit or "").strip().lower()
-                qty = float(ing.quantity or 0)
-                items.setdefault(key, 0.0)
-                items[key] += qty
-    # Transform for template
-    aggregated = [
-        {"name": k[0], "unit": k[1], "quantity": v}
-        for k, v in sorted(items.items())
-    ]
-    return render_template("planner/grocery_list.html", selected_date=selected_date, items=aggregated)
+    # ?date= lists one day, ?start=&end= any range up to MAX_GROCERY_DAYS
+    start = _parse_date(request.args.get("start") or request.args.get("date"), date.today())
+    end = _parse_date(request.args.get("end"), start)
+    if end < start:
+        start, end = end, start
+    end = min(end, start + timedelta(days=MAX_GROCERY_DAYS - 1))
+
+    aggregated = []
+    for row in grocery_items(current_user.id, start, end):
+        qty, unit = display_quantity(row.quantity, row.unit)
+        aggregated.append({"name": row.name, "unit": unit, "quantity": qty})
+    week_start = start - timedelta(days=start.weekday())
+    month_start = start.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    ranges = {
+        "Day": (start, start),
+        "Week": (week_start, week_start + timedelta(days=6)),
+        "Month": (month_start, next_month - timedelta(days=1)),
+    }
+    return render_template(
+        "planner/grocery_list.html",
+        selected_date=start,
+        start_date=start,
+        end_date=end,
+        ranges=ranges,
+        items=aggregated,
+    )
+
+
+@planner_bp.route("/recipes")
+@login_required
+def recipe_picker():
+    """Page through the recipes the user can plan, by name, as JSON."""
+    query = Recipe.query.options(selectinload(Recipe.images)).filter(
+        (Recipe.public == True) | (Recipe.user_id == current_user.id)
+    )
+    q = request.args.get("q", "").strip()
+    if q:
+        query = search_recipes(query, q, ranked=False)
+    page = keyset_paginate(
+        query, Recipe.name, Recipe.id, False, request.args.get("cursor"), PICKER_PAGE_SIZE
+    )
+    return jsonify(
+        items=[
+            {
+                "id": r.id,
+                "name": r.name,
+                "image": r.images[0].url if r.images else None,
+                "mine": r.user_id == current_user.id,
+            }
+            for r in page.items
+        ],
+        next_cursor=page.next_cursor,
+    )
 
 
 @planner_bp.route("/suggestions")
 @login_required
 def suggestions():
     goal = (request.args.get("goal") or "").lower().replace(" ", "_")
-    if goal not in ("high_protein", "low_carb", "balanced"):
+    if goal not in GOALS:
         goal = "balanced"
-    recipes = Recipe.query.filter((Recipe.public == True) | (Recipe.user_id == current_user.id)).all()
-    scored = sorted(((r, score_recipe_for_goal(r, goal)) for r in recipes), key=lambda x: x[1], reverse=True)
-    # top 10
-    scored = [(r, s) for r, s in scored[:10]]
+    # top 10, scored in one vectorized pass over the cached macros
+    scored = top_recipes_for_goal(current_user.id, goal, k=10)
     return render_template("planner/suggestions.html", goal=goal, scored=scored)
 
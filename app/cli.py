@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+
+from app.extensions import cache, db
+from app.models.ingredients import Ingredient
+from app.services.search import rebuild_search_index
+from app.services.autocomplete import rebuild_ingredient_index
+from app.services.food_db import build_food_database, food_db
+from app.services.units import apply_base_quantity
+from app.services.timeline import rebuild_timeline
+from app.services.counters import rebuild_counters
+from app.services.upload import upload_service
+from app.services.images import build_missing_variants
+
+search_cli = AppGroup("search", help="Maintain the recipe and ingredient search indexes.")
+nutrition_cli = AppGroup("nutrition", help="Maintain the nutrition dataset.")
+timeline_cli = AppGroup("timeline", help="Maintain the community timeline.")
+counters_cli = AppGroup("counters", help="Maintain the denormalized recipe and post counters.")
+cache_cli = AppGroup("cache", help="Manage the application cache.")
+uploads_cli = AppGroup("uploads", help="Maintain the upload folder.")
+images_cli = AppGroup("images", help="Maintain resized image variants.")
+
+
+@search_cli.command("rebuild")
+def rebuild_search():
+    """Rebuild the recipe search index from the recipes table."""
+    rebuild_search_index()
+    click.echo("Recipe search index rebuilt.")
+
+
+@search_cli.command("rebuild-ingredients")
+def rebuild_ingredients():
+    """Rebuild the ingredient autocomplete index from the ingredients table."""
+    rebuild_ingredient_index()
+    click.echo("Ingredient autocomplete index rebuilt.")
+
+
+@nutrition_cli.command("build")
+def build_nutrition():
+    """Compile NUTRITION_SOURCE_PATH into the indexed SQLite lookup file."""
+    target = current_app.config["NUTRITION_DB_PATH"]
+    count = build_food_database(current_app.config["NUTRITION_SOURCE_PATH"], target)
+    food_db.invalidate()
+    click.echo(f"Wrote {count} foods to {target}.")
+
+
+@nutrition_cli.command("normalize-units")
+def normalize_units():
+    """Fill base_quantity/base_unit on ingredients saved before they existed."""
+    updated = 0
+    while True:
+        batch = Ingredient.query.filter(Ingredient.base_unit.is_(None)).limit(500).all()
+        if not batch:
+            break
+        for ingredient in batch:
+            apply_base_quantity(ingredient)
+        db.session.commit()
+        updated += len(batch)
+    click.echo(f"Normalized {updated} ingredients.")
+
+
+@timeline_cli.command("rebuild")
+def rebuild_community_timeline():
+    """Rebuild the community timeline from public recipes and published posts."""
+    count = rebuild_timeline()
+    click.echo(f"Timeline rebuilt with {count} entries.")
+
+
+@counters_cli.command("rebuild")
+def rebuild_all_counters():
+    """Recompute every recipe and post counter from the child tables."""
+    rebuild_counters()
+    click.echo("Recipe and post counters rebuilt.")
+
+
+@cache_cli.command("clear")
+def clear_cache():
+    """Drop every entry of the configured cache backend."""
+    cache.clear()
+    click.echo(f"Cleared {type(cache.backend).__name__}.")
+
+
+@uploads_cli.command("purge-sessions")
+@click.option("--hours", type=int, default=None, help="Idle time before a session is dropped.")
+def purge_upload_sessions(hours):
+    """Delete abandoned resumable uploads and their partial files."""
+    hours = hours if hours is not None else current_app.config["UPLOAD_SESSION_MAX_AGE_HOURS"]
+    count = upload_service.purge_sessions(timedelta(hours=hours))
+    click.echo(f"Purged {count} upload sessions.")
+
+
+@uploads_cli.command("shard")
+@click.option("--batch-size", type=int, default=500, show_default=True)
+@click.option("--pause", type=float, default=0.2, show_default=True, help="Seconds to sleep between batches.")
+def shard_uploads(batch_size, pause):
+    """Move files from the top of UPLOAD_FOLDER into their shard directories."""
+    if not current_app.config.get("UPLOAD_SHARD_DEPTH"):
+        raise click.ClickException("UPLOAD_SHARD_DEPTH is 0: uploads are kept flat.")
+    moved = upload_service.migrate_to_shards(batch_size, pause, lambda n: click.echo(f"Moved {n} files..."))
+    click.echo(f"Moved {moved} files into shard directories.")
+
+
+@uploads_cli.command("gc")
+@click.option("--hours", type=int, default=24, show_default=True, help="Only files older than this.")
+@click.option("--dry-run", is_flag=True, help="List the files without deleting them.")
+def collect_upload_garbage(hours, dry_run):
+    """Delete uploads and variants that no image, video or upload session references."""
+    removed = upload_service.collect_garbage(timedelta(hours=hours), dry_run=dry_run)
+    for path in removed:
+        click.echo(path)
+    click.echo(f"{'Would delete' if dry_run else 'Deleted'} {len(removed)} files.")
+
+
+@images_cli.command("variants")
+@click.option("--batch-size", type=int, default=50, show_default=True)
+def build_image_variants(batch_size):
+    """Generate the resized variants of images that don't have them yet."""
+    count = build_missing_variants(batch_size)
+    click.echo(f"Generated variants for {count} images.")
+
+
+def register_commands(app: Flask):
+    app.cli.add_command(search_cli)
+    app.cli.add_command(nutrition_cli)
+    app.cli.add_command(timeline_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(cache_cli)
+    app.cli.add_command(uploads_cli)
+    app.cli.add_command(images_cli)
@@ -12,6 +12,58 @@ INSTANCE_DIR = os.path.join(BASE_DIR, "instance")
 DEFAULT_UPLOAD_DIR = os.path.join(INSTANCE_DIR, "uploads")
 UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", DEFAULT_UPLOAD_DIR)
 MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", 16 * 1024 * 1024))
+# Upload names are unique, so /uploads responses may be cached for good
+UPLOAD_CACHE_MAX_AGE = int(os.environ.get("UPLOAD_CACHE_MAX_AGE", 365 * 24 * 3600))
+# Hand /uploads off to the front server: "" (stream from Python, with Range
+# support), "x-sendfile" (Apache/lighttpd) or "x-accel-redirect" (nginx, with
+# an internal location at UPLOAD_ACCEL_PREFIX aliased to UPLOAD_FOLDER)
+UPLOAD_SENDFILE = os.environ.get("UPLOAD_SENDFILE", "").lower()
+UPLOAD_ACCEL_PREFIX = os.environ.get("UPLOAD_ACCEL_PREFIX", "/_uploads/")
+# Levels of two-hex-character directories uploads are spread over (0 keeps
+# UPLOAD_FOLDER flat); move existing files with `flask uploads shard`
+UPLOAD_SHARD_DEPTH = int(os.environ.get("UPLOAD_SHARD_DEPTH", 2))
+# Resumable uploads: partial files (same filesystem as UPLOAD_FOLDER keeps
+# the final move cheap), the chunk size clients are told to send (must stay
+# under MAX_CONTENT_LENGTH) and how long idle sessions are kept
+UPLOAD_SESSION_FOLDER = os.environ.get("UPLOAD_SESSION_FOLDER", os.path.join(INSTANCE_DIR, "upload-sessions"))
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+UPLOAD_SESSION_MAX_AGE_HOURS = int(os.environ.get("UPLOAD_SESSION_MAX_AGE_HOURS", 24))
+
+# Uploaded images get resized WebP variants in a process pool, one per width
+# below the original's (the largest is capped at the last width)
+IMAGE_VARIANT_WIDTHS = tuple(int(w) for w in os.environ.get("IMAGE_VARIANT_WIDTHS", "160,320,640,1280").split(","))
+IMAGE_VARIANT_QUALITY = int(os.environ.get("IMAGE_VARIANT_QUALITY", 80))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+
+# Application cache (app.utils.cache): memory, sqlite, redis or null
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_URL = os.environ.get("CACHE_URL")  # SQLite file path or Redis URL
+CACHE_DEFAULT_TTL = int(os.environ.get("CACHE_DEFAULT_TTL", 300))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 10000))
+CACHE_KEY_PREFIX = os.environ.get("CACHE_KEY_PREFIX", "odigo:")
+
+# Listings use cursor pagination instead of OFFSET pages when enabled
+# (individual requests can opt in with ?cursor=)
+KEYSET_PAGINATION = os.environ.get("KEYSET_PAGINATION", "").lower() in ("1", "true", "yes")
+
+# How often each worker reloads the public recipe ids used for recommendations
+RECOMMENDATION_REFRESH_SECONDS = int(os.environ.get("RECOMMENDATION_REFRESH_SECONDS", 300))
+
+# How often each worker reloads the public recipe macro matrix used by planner suggestions
+MACRO_MATRIX_REFRESH_SECONDS = int(os.environ.get("MACRO_MATRIX_REFRESH_SECONDS", 60))
+
+# How often each worker checks whether categories/origins changed
+REFERENCE_DATA_CHECK_SECONDS = int(os.environ.get("REFERENCE_DATA_CHECK_SECONDS", 30))
+
+# Time the meal plan generator may spend improving a plan, per request
+PLAN_GENERATOR_BUDGET_MS = int(os.environ.get("PLAN_GENERATOR_BUDGET_MS", 150))
+
+# Nutrition dataset: the CSV source is compiled into an indexed SQLite file
+# that workers open read-only and memory-mapped
+NUTRITION_SOURCE_PATH = os.environ.get(
+    "NUTRITION_SOURCE_PATH", os.path.join(BASE_DIR, "app", "data", "foods.csv")
+)
+NUTRITION_DB_PATH = os.environ.get("NUTRITION_DB_PATH", os.path.join(INSTANCE_DIR, "nutrition.sqlite"))
 
 # Google OAuth
 GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID")
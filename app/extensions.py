@@ -2,6 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 
+from app.utils.cache import Cache
+
 db = SQLAlchemy()
 migrate = Migrate()
 csrf = CSRFProtect()
+cache = Cache()
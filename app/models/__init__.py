@@ -5,12 +5,14 @@ from .comment import Comment
 from .favorite import Favorite
 from .image import Image
 from .ingredients import Ingredient
+from .ingredient_term import IngredientTerm, IngredientTermUser, IngredientTermGram
 from .kyc import KYC
 from .language import Language
 from .origin import Origin
 from .post import Post
 from .preference import Preference
 from .recipe import Recipe
+from .recipe_macros import RecipeMacros
 from .review import Review
 from .stat import Stat
 from .step import Step
@@ -18,6 +20,9 @@ from .task import Task
 from .video import Video
 from .meal import MealPlan, MealEntry
 from .shopping_list import ShoppingListItem
+from .timeline import TimelineEntry
+from .cache_version import CacheVersion
+from .upload_session import UploadSession
 
 __all__ = [
     "User",
@@ -27,12 +32,16 @@ __all__ = [
     "Favorite",
     "Image",
     "Ingredient",
+    "IngredientTerm",
+    "IngredientTermUser",
+    "IngredientTermGram",
     "KYC",
     "Language",
     "Origin",
     "Post",
     "Preference",
     "Recipe",
+    "RecipeMacros",
     "Review",
     "Stat",
     "Step",
@@ -41,4 +50,7 @@ __all__ = [
     "MealPlan",
     "MealEntry",
     "ShoppingListItem",
+    "TimelineEntry",
+    "CacheVersion",
+    "UploadSession",
 ]
@@ -0,0 +1,14 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class CacheVersion(db.Model):
+    """Version number of a per-worker cache, bumped by whoever writes its data."""
+    __tablename__ = "cache_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.name}={self.version}>"
@@ -6,7 +6,7 @@ class Image(db.Model):
     __tablename__ = "images"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    url = db.Column(db.String(255), nullable=False)
+    url = db.Column(db.String(255), nullable=False, index=True)
 
     # Foreign keys - only one should be set
     recipe_id = db.Column(db.Integer, db.ForeignKey("recipes.id"), nullable=True)
@@ -18,6 +18,8 @@ class Image(db.Model):
     alt_text = db.Column(db.String(255))
     caption = db.Column(db.Text)
     is_primary = db.Column(db.Boolean, default=False)
+    # Resized WebP copies, {"<width>": url}; None until generated
+    variants = db.Column(db.JSON(none_as_null=True))
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -0,0 +1,53 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class IngredientTerm(db.Model):
+    """Distinct (name, unit) pair used by the ingredient autocomplete."""
+
+    __tablename__ = "ingredient_terms"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.String(255), nullable=False)
+    unit = db.Column(db.String(50), nullable=False, default="")
+    # " word1 word2" lowercased, used to verify word-prefix matches
+    search_key = db.Column(db.String(260), nullable=False)
+
+    # Aggregates over public ingredients
+    usage_count = db.Column(db.Integer, nullable=False, default=0)
+    last_used = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("name", "unit", name="uq_ingredient_term_name_unit"),
+    )
+
+    def __repr__(self):
+        return f"<IngredientTerm {self.name} ({self.unit})>"
+
+
+class IngredientTermUser(db.Model):
+    """Per-user usage of an autocomplete term, to rank a user's own ingredients first."""
+
+    __tablename__ = "ingredient_term_users"
+
+    term_id = db.Column(db.Integer, db.ForeignKey("ingredient_terms.id"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    usage_count = db.Column(db.Integer, nullable=False, default=0)
+    # Private ingredients are only visible to their owner, so they are counted here
+    private_count = db.Column(db.Integer, nullable=False, default=0)
+    last_used = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<IngredientTermUser term={self.term_id} user={self.user_id}>"
+
+
+class IngredientTermGram(db.Model):
+    """Trigram posting list entry pointing at an autocomplete term."""
+
+    __tablename__ = "ingredient_term_grams"
+
+    gram = db.Column(db.String(3), primary_key=True)
+    term_id = db.Column(db.Integer, db.ForeignKey("ingredient_terms.id"), primary_key=True)
+
+    def __repr__(self):
+        return f"<IngredientTermGram {self.gram!r} term={self.term_id}>"
@@ -9,6 +9,10 @@ class Ingredient(db.Model):
     name = db.Column(db.String(255), nullable=False)
     unit = db.Column(db.String(50))  # teaspoon, cup, gram, etc.
     quantity = db.Column(db.Float)
+    # quantity/unit resolved by app.services.units: grams, millilitres,
+    # pieces, or the normalized unit when it has no dimension
+    base_quantity = db.Column(db.Float)
+    base_unit = db.Column(db.String(20))
     notes = db.Column(db.String(255))  # optional notes
     image_url = db.Column(db.String(255))
 
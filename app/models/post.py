@@ -11,6 +11,11 @@ class Post(db.Model):
     status = db.Column(db.String(50), default="draft")
 
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+
+    # Denormalized child counts, kept by app.services.counters
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    image_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -19,6 +19,13 @@ class Recipe(db.Model):
     stats_id = db.Column(db.Integer, db.ForeignKey("stats.id"))
     review_id = db.Column(db.Integer, db.ForeignKey("reviews.id"))
 
+    # Denormalized child counts, kept by app.services.counters
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    image_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    step_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    ingredient_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(
@@ -31,6 +38,13 @@ class Recipe(db.Model):
     images = db.relationship("Image", backref="recipe", lazy=True)
     videos = db.relationship("Video", backref="recipe", lazy=True)
     comments = db.relationship("Comment", backref="recipe", lazy=True)
+    macros = db.relationship("RecipeMacros", backref="recipe", uselist=False, cascade="all, delete-orphan")
+
+    # Keys for cursor pagination of listings
+    __table_args__ = (
+        db.Index("ix_recipes_created_at_id", "created_at", "id"),
+        db.Index("ix_recipes_name_id", "name", "id"),
+    )
 
     def __repr__(self):
         return f"<Recipe {self.name}>"
@@ -0,0 +1,24 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class RecipeMacros(db.Model):
+    """Cached output of ``estimate_recipe_macros`` for one recipe."""
+
+    __tablename__ = "recipe_macros"
+
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipes.id"), primary_key=True)
+    protein = db.Column(db.Float, nullable=False, default=0.0)
+    carbs = db.Column(db.Float, nullable=False, default=0.0)
+    fats = db.Column(db.Float, nullable=False, default=0.0)
+    calories = db.Column(db.Float, nullable=False, default=0.0)
+
+    # nutrition_version() the values were computed with
+    nutrition_version = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def as_dict(self):
+        return {"protein": self.protein, "carbs": self.carbs, "fats": self.fats, "calories": self.calories}
+
+    def __repr__(self):
+        return f"<RecipeMacros recipe={self.recipe_id} v{self.nutrition_version}>"
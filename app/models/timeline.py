@@ -0,0 +1,25 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class TimelineEntry(db.Model):
+    """One published item of the community feed (a recipe or a post).
+
+    Rows are written when something is published and removed when it is
+    unpublished or deleted, so the feed is a range scan over
+    ``ix_timeline_created_at_id``.
+    """
+    __tablename__ = "timeline"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    kind = db.Column(db.String(20), nullable=False)  # recipe, post
+    ref_id = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("kind", "ref_id", name="uq_timeline_kind_ref"),
+        db.Index("ix_timeline_created_at_id", "created_at", "id"),
+    )
+
+    def __repr__(self):
+        return f"<TimelineEntry {self.kind} {self.ref_id}>"
@@ -0,0 +1,25 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class UploadSession(db.Model):
+    """A resumable upload: chunks are appended to a partial file until
+    ``received`` reaches ``size``, then the file is stored and ``url`` set."""
+    __tablename__ = "upload_sessions"
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)
+    url = db.Column(db.String(255))
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def complete(self) -> bool:
+        return self.url is not None
+
+    def __repr__(self):
+        return f"<UploadSession {self.id} {self.received}/{self.size}>"
@@ -6,7 +6,7 @@ class Video(db.Model):
     __tablename__ = "videos"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    video_url = db.Column(db.String(255), nullable=False)
+    video_url = db.Column(db.String(255), nullable=False, index=True)
     is_main = db.Column(db.Boolean, default=False)
     caption = db.Column(db.String(255))
 
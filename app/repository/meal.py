@@ -0,0 +1,112 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import selectinload
+
+from app.extensions import db
+from app.models.ingredients import Ingredient
+from app.models.meal import MealEntry, MealPlan
+from app.models.recipe import Recipe
+from app.utils.db import insert_ignore
+
+
+def grocery_items(user_id: int, start: date, end: date) -> List:
+    """Aggregated ingredients of every meal planned from *start* to *end*.
+
+    One grouped query over meal plans, entries, recipes and ingredients; a
+    recipe planned twice counts twice. Quantities are summed in base units
+    (see ``app.services.units``), falling back to the raw quantity and unit
+    for ingredients saved before those were stored.
+    """
+    name = func.lower(func.trim(Ingredient.name))
+    unit = func.coalesce(Ingredient.base_unit, func.lower(func.trim(func.coalesce(Ingredient.unit, ""))))
+    quantity = func.sum(func.coalesce(Ingredient.base_quantity, Ingredient.quantity, 0))
+    return (
+        db.session.query(name.label("name"), unit.label("unit"), quantity.label("quantity"))
+        .select_from(MealPlan)
+        .join(MealEntry, MealEntry.meal_plan_id == MealPlan.id)
+        .join(Recipe, Recipe.id == MealEntry.recipe_id)
+        .join(Ingredient, Ingredient.recipe_id == Recipe.id)
+        .filter(MealPlan.user_id == user_id, MealPlan.plan_date.between(start, end))
+        .group_by(name, unit)
+        .order_by(name, unit)
+        .all()
+    )
+
+
+def get_plan_with_recipes(user_id: int, plan_date: date) -> MealPlan | None:
+    """Load a day's plan with its entries, their recipes, images and ingredients.
+
+    Each level is one ``SELECT ... IN``, so the planner page costs the same
+    number of queries however many meals are planned.
+    """
+    recipe = selectinload(MealPlan.entries).selectinload(MealEntry.recipe)
+    return (
+        MealPlan.query.options(
+            recipe.selectinload(Recipe.images),
+            recipe.selectinload(Recipe.ingredients),
+        )
+        .filter_by(user_id=user_id, plan_date=plan_date)
+        .first()
+    )
+
+
+def ensure_plans(user_id: int, dates: Iterable[date]) -> Dict[date, int]:
+    """Return ``{plan_date: plan_id}``, creating missing plans (caller commits).
+
+    Missing days are inserted in one ``INSERT ... ON CONFLICT DO NOTHING``
+    against ``uq_user_date``, so concurrent saves never collide.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return {}
+    now = datetime.utcnow()
+    insert_ignore(
+        MealPlan,
+        [{"user_id": user_id, "plan_date": d, "created_at": now} for d in dates],
+        ["user_id", "plan_date"],
+    )
+    rows = (
+        db.session.query(MealPlan.id, MealPlan.plan_date)
+        .filter(MealPlan.user_id == user_id, MealPlan.plan_date.in_(dates))
+        .all()
+    )
+    return {row.plan_date: row.id for row in rows}
+
+
+def planned_entries(user_id: int, start: date, end: date) -> List:
+    """``(plan_date, meal_type, recipe_id, recipe_name)`` of every meal in the range."""
+    return (
+        db.session.query(MealPlan.plan_date, MealEntry.meal_type, Recipe.id.label("recipe_id"), Recipe.name.label("recipe_name"))
+        .join(MealEntry, MealEntry.meal_plan_id == MealPlan.id)
+        .join(Recipe, Recipe.id == MealEntry.recipe_id)
+        .filter(MealPlan.user_id == user_id, MealPlan.plan_date.between(start, end))
+        .order_by(MealPlan.plan_date, MealEntry.id)
+        .all()
+    )
+
+
+def set_meals(user_id: int, slots: Dict[Tuple[date, str], int | None]) -> None:
+    """Write ``{(plan_date, meal_type): recipe_id}`` slots (caller commits).
+
+    Plans are created as needed, the given slots are cleared with one
+    ``DELETE`` and refilled with one multi-row ``INSERT``; a ``None``
+    recipe id just clears its slot.
+    """
+    if not slots:
+        return
+    plan_ids = ensure_plans(user_id, (d for d, _ in slots))
+    MealEntry.query.filter(
+        tuple_(MealEntry.meal_plan_id, MealEntry.meal_type).in_(
+            [(plan_ids[d], meal_type) for d, meal_type in slots]
+        )
+    ).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    entries = [
+        {"meal_plan_id": plan_ids[d], "meal_type": meal_type, "recipe_id": rid, "created_at": now}
+        for (d, meal_type), rid in slots.items()
+        if rid is not None
+    ]
+    if entries:
+        db.session.execute(MealEntry.__table__.insert(), entries)
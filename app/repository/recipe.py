@@ -0,0 +1,115 @@
+from typing import Dict
+
+from flask import abort
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+
+from app.extensions import cache, db
+
+from app.models.comment import Comment
+from app.models.favorite import Favorite
+from app.models.ingredients import Ingredient
+from app.models.recipe import Recipe
+from app.models.step import Step
+from app.models.user import User
+from app.services.versions import AUTHORS, CATALOGUE, version_validators
+
+# sort_by value -> (key column, descending)
+RECIPE_SORTS = {
+    "date_desc": (Recipe.created_at, True),
+    "date_asc": (Recipe.created_at, False),
+    "name_asc": (Recipe.name, False),
+    "name_desc": (Recipe.name, True),
+}
+
+
+def recipe_sort(sort_by: str):
+    """Return ``(column, descending)`` for a listing's ``sort_by`` value."""
+    return RECIPE_SORTS.get(sort_by, RECIPE_SORTS["date_desc"])
+
+
+@cache.memoize(ttl=60)
+def public_recipe_count() -> int:
+    return Recipe.query.filter_by(public=True).count()
+
+
+@cache.memoize(ttl=60)
+def category_recipe_counts() -> Dict[int, int]:
+    """``{category_id: number of recipes}`` in one grouped query."""
+    rows = (
+        db.session.query(Recipe.category_id, func.count(Recipe.id))
+        .filter(Recipe.category_id.isnot(None))
+        .group_by(Recipe.category_id)
+    )
+    return dict(rows.all())
+
+
+def recipe_validators(recipe_id: int, user_id: int):
+    """``(etag_parts, last_modified)`` of a recipe detail page, or None if it won't render.
+
+    Child writes (comments, favorites, the recipe form) all update the
+    recipe row, so its ``updated_at`` and counters plus the author's and
+    the viewer's favorite state cover everything the page shows.
+    """
+    row = (
+        db.session.query(
+            Recipe.updated_at, Recipe.public, Recipe.user_id, Recipe.comment_count,
+            Recipe.favorite_count, User.updated_at.label("author_updated_at"),
+        )
+        .outerjoin(User, User.id == Recipe.user_id)
+        .filter(Recipe.id == recipe_id)
+        .first()
+    )
+    if row is None or (not row.public and row.user_id != user_id):
+        return None
+    favorited = db.session.query(
+        Favorite.query.filter_by(user_id=user_id, recipe_id=recipe_id).exists()
+    ).scalar()
+    return (recipe_id, tuple(row), favorited), row.updated_at
+
+
+def catalogue_validators():
+    """``(etag_parts, last_modified)`` covering every recipe listing and its authors."""
+    return version_validators(CATALOGUE, AUTHORS)
+
+
+def recipe_aggregate_options():
+    """Loader options that fetch everything a recipe detail page renders.
+
+    Every collection (and each nested collection) is loaded with one
+    ``SELECT ... WHERE parent_id IN (...)``, so the number of queries stays
+    fixed however many steps, ingredients or comments the recipe has.
+    """
+    return (
+        selectinload(Recipe.author),
+        selectinload(Recipe.category),
+        selectinload(Recipe.origin),
+        selectinload(Recipe.images),
+        selectinload(Recipe.videos),
+        selectinload(Recipe.ingredients).selectinload(Ingredient.images),
+        selectinload(Recipe.steps).selectinload(Step.images),
+        selectinload(Recipe.comments).selectinload(Comment.author),
+    )
+
+
+def recipe_form_options():
+    """Loader options for the edit form: only the collections it prefills."""
+    return (
+        selectinload(Recipe.images),
+        selectinload(Recipe.videos),
+        selectinload(Recipe.ingredients),
+        selectinload(Recipe.steps),
+    )
+
+
+def get_recipe_aggregate(recipe_id: int, options=None) -> Recipe | None:
+    """Load a recipe together with its whole object graph, or with *options*."""
+    options = recipe_aggregate_options() if options is None else options
+    return Recipe.query.options(*options).filter(Recipe.id == recipe_id).first()
+
+
+def get_recipe_aggregate_or_404(recipe_id: int, options=None) -> Recipe:
+    recipe = get_recipe_aggregate(recipe_id, options)
+    if recipe is None:
+        abort(404)
+    return recipe
@@ -0,0 +1,256 @@
+"""Trigram index behind the ingredient autocomplete endpoint.
+
+Every distinct (name, unit) pair gets one ``IngredientTerm`` row holding
+pre-aggregated usage counts, a per-user ``IngredientTermUser`` row, and one
+``IngredientTermGram`` row per trigram of each word in the name (words are
+left-padded so one and two letter prefixes are indexed too). A query word
+matches when it is the prefix of a word in the name, so lookups are an
+indexed posting-list intersection instead of an ``ILIKE '%q%'`` scan over
+``ingredients``.
+
+Counts are maintained incrementally by ``record_ingredients`` and
+``forget_ingredients``, which the recipe views call in the same transaction
+as the ingredient writes.
+"""
+from __future__ import annotations
+
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import and_, bindparam, case, func, or_, tuple_, update
+
+from app.extensions import db
+from app.models.ingredient_term import IngredientTerm, IngredientTermGram, IngredientTermUser
+from app.models.ingredients import Ingredient
+from app.utils.db import insert_ignore
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Keeps bulk statements under SQLite's bound-parameter limit
+_BATCH_SIZE = 500
+
+TermKey = Tuple[str, str]
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+def _search_key(name: str) -> str:
+    return " " + " ".join(_words(name))
+
+
+def _grams(padded: str) -> Set[str]:
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def name_grams(name: str) -> Set[str]:
+    grams: Set[str] = set()
+    for word in _words(name):
+        grams |= _grams(f"  {word} ")
+    return grams
+
+
+def _query_grams(words: List[str]) -> Set[str]:
+    grams: Set[str] = set()
+    for word in words:
+        grams |= _grams(f"  {word}")
+    return grams
+
+
+def _key(name: str | None, unit: str | None) -> TermKey:
+    return (name or "").strip(), (unit or "").strip()
+
+
+def _ensure_terms(keys: Iterable[TermKey]) -> Dict[TermKey, int]:
+    """Insert missing terms (and their grams) and return their ids."""
+    keys = list(set(keys))
+    ids: Dict[TermKey, int] = {}
+    for start in range(0, len(keys), _BATCH_SIZE):
+        ids.update(_ensure_term_batch(keys[start : start + _BATCH_SIZE]))
+    return ids
+
+
+def _ensure_term_batch(keys: List[TermKey]) -> Dict[TermKey, int]:
+    insert_ignore(
+        IngredientTerm,
+        [
+            {"name": name, "unit": unit, "search_key": _search_key(name), "usage_count": 0}
+            for name, unit in keys
+        ],
+        ["name", "unit"],
+    )
+    rows = (
+        db.session.query(IngredientTerm.id, IngredientTerm.name, IngredientTerm.unit)
+        .filter(tuple_(IngredientTerm.name, IngredientTerm.unit).in_(keys))
+        .all()
+    )
+    ids = {(r.name, r.unit): r.id for r in rows}
+    insert_ignore(
+        IngredientTermGram,
+        [{"gram": g, "term_id": ids[k]} for k in keys for g in name_grams(k[0])],
+        ["gram", "term_id"],
+    )
+    return ids
+
+
+def _apply(rows, user_id: int, sign: int) -> None:
+    public_counts: Counter = Counter()
+    user_counts: Counter = Counter()
+    private_counts: Counter = Counter()
+    for name, unit, public in rows:
+        key = _key(name, unit)
+        if not key[0]:
+            continue
+        user_counts[key] += 1
+        if public is False:
+            private_counts[key] += 1
+        else:
+            public_counts[key] += 1
+    if not user_counts:
+        return
+
+    ids = _ensure_terms(user_counts)
+    now = datetime.utcnow()
+    term_values = {"usage_count": IngredientTerm.usage_count + bindparam("n")}
+    user_values = {
+        "usage_count": IngredientTermUser.usage_count + bindparam("n"),
+        "private_count": IngredientTermUser.private_count + bindparam("p"),
+    }
+    if sign > 0:
+        term_values["last_used"] = now
+        user_values["last_used"] = now
+
+    db.session.execute(
+        update(IngredientTerm.__table__)
+        .where(IngredientTerm.__table__.c.id == bindparam("tid"))
+        .values(**term_values),
+        [{"tid": ids[k], "n": sign * public_counts[k]} for k in user_counts]
+    )
+
+    insert_ignore(
+        IngredientTermUser,
+        [{"term_id": ids[k], "user_id": user_id, "usage_count": 0, "private_count": 0} for k in user_counts],
+        ["term_id", "user_id"],
+    )
+    table = IngredientTermUser.__table__
+    db.session.execute(
+        update(table)
+        .where(and_(table.c.term_id == bindparam("tid"), table.c.user_id == bindparam("uid")))
+        .values(**user_values),
+        [
+            {"tid": ids[k], "uid": user_id, "n": sign * n, "p": sign * private_counts[k]}
+            for k, n in user_counts.items()
+        ]
+    )
+
+
+def record_ingredients(ingredients: Iterable[Ingredient], user_id: int) -> None:
+    """Count newly inserted ingredients into the index (caller commits)."""
+    _apply([(i.name, i.unit, i.public) for i in ingredients], user_id, 1)
+
+
+def forget_ingredients(rows, user_id: int) -> None:
+    """Uncount (name, unit, public) rows that are about to be deleted."""
+    _apply(rows, user_id, -1)
+
+
+def search_terms(q: str, user_id: int, limit: int = 10) -> List:
+    """Return up to *limit* terms whose words start with every word of *q*.
+
+    The user's own ingredients come first, then the most used, then the most
+    recently used.
+    """
+    words = _words(q)
+    if not words:
+        return []
+    grams = _query_grams(words)
+
+    candidates = (
+        db.session.query(IngredientTermGram.term_id)
+        .filter(IngredientTermGram.gram.in_(grams))
+        .group_by(IngredientTermGram.term_id)
+        .having(func.count(IngredientTermGram.gram) == len(grams))
+        .subquery()
+    )
+    mine = and_(IngredientTermUser.term_id == IngredientTerm.id, IngredientTermUser.user_id == user_id)
+    usage_count = IngredientTerm.usage_count + func.coalesce(IngredientTermUser.private_count, 0)
+
+    return (
+        db.session.query(IngredientTerm.name, IngredientTerm.unit, usage_count.label("usage_count"))
+        .join(candidates, candidates.c.term_id == IngredientTerm.id)
+        .outerjoin(IngredientTermUser, mine)
+        .filter(or_(IngredientTerm.usage_count > 0, IngredientTermUser.private_count > 0))
+        .filter(*[IngredientTerm.search_key.contains(" " + w, autoescape=True) for w in words])
+        .order_by(
+            case((IngredientTermUser.usage_count > 0, 1), else_=0).desc(),
+            usage_count.desc(),
+            IngredientTerm.last_used.desc(),
+        )
+        .limit(limit)
+        .all()
+    )
+
+
+def rebuild_ingredient_index(commit: bool = True) -> None:
+    """Rebuild every autocomplete table from the ingredients table."""
+    db.session.query(IngredientTermGram).delete()
+    db.session.query(IngredientTermUser).delete()
+    db.session.query(IngredientTerm).delete()
+
+    public = case((Ingredient.public == False, 0), else_=1)
+    rows = (
+        db.session.query(
+            Ingredient.name,
+            Ingredient.unit,
+            Ingredient.user_id,
+            func.count(Ingredient.id).label("n"),
+            func.sum(public).label("public_n"),
+            func.max(Ingredient.created_at).label("last_used"),
+        )
+        .group_by(Ingredient.name, Ingredient.unit, Ingredient.user_id)
+        .all()
+    )
+
+    terms: Dict[TermKey, dict] = {}
+    users: Dict[Tuple[TermKey, int], dict] = {}
+    for r in rows:
+        key = _key(r.name, r.unit)
+        if not key[0]:
+            continue
+        term = terms.setdefault(key, {"usage_count": 0, "last_used": None})
+        term["usage_count"] += r.public_n or 0
+        if r.last_used and (term["last_used"] is None or r.last_used > term["last_used"]):
+            term["last_used"] = r.last_used
+        if r.user_id is not None:
+            user = users.setdefault((key, r.user_id), {"usage_count": 0, "private_count": 0, "last_used": r.last_used})
+            user["usage_count"] += r.n
+            user["private_count"] += r.n - (r.public_n or 0)
+            if r.last_used and (user["last_used"] is None or r.last_used > user["last_used"]):
+                user["last_used"] = r.last_used
+
+    ids = _ensure_terms(terms)
+    if terms:
+        db.session.execute(
+            update(IngredientTerm.__table__)
+            .where(IngredientTerm.__table__.c.id == bindparam("tid"))
+            .values(usage_count=bindparam("n"), last_used=bindparam("ts")),
+            [{"tid": ids[k], "n": v["usage_count"], "ts": v["last_used"]} for k, v in terms.items()]
+        )
+    if users:
+        db.session.execute(
+            IngredientTermUser.__table__.insert(),
+            [{"term_id": ids[k], "user_id": uid, **v} for (k, uid), v in users.items()]
+        )
+    if commit:
+        db.session.commit()
+
+
+def ensure_ingredient_index() -> None:
+    """Backfill the autocomplete tables the first time they are empty."""
+    if db.session.query(IngredientTerm.id).first() is not None:
+        return
+    if db.session.query(Ingredient.id).first() is None:
+        return
+    rebuild_ingredient_index()
@@ -0,0 +1,71 @@
+"""Denormalized child counts on recipes and posts.
+
+``comment_count``, ``favorite_count``, ``image_count``, ``step_count`` and
+``ingredient_count`` let listings show counts without loading collections.
+Writers keep them current inside their own transaction: single additions
+and removals bump the column in SQL (``UPDATE ... SET n = n + 1``), bulk
+rewrites such as the recipe form recount from the child tables, and
+``flask counters rebuild`` reconciles every row.
+"""
+from __future__ import annotations
+
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.comment import Comment
+from app.models.favorite import Favorite
+from app.models.image import Image
+from app.models.ingredients import Ingredient
+from app.models.post import Post
+from app.models.recipe import Recipe
+from app.models.step import Step
+
+# counter column -> foreign key of the counted rows, per owner model
+COUNTERS = {
+    Recipe: {
+        "comment_count": Comment.recipe_id,
+        "favorite_count": Favorite.recipe_id,
+        "image_count": Image.recipe_id,
+        "step_count": Step.recipe_id,
+        "ingredient_count": Ingredient.recipe_id,
+    },
+    Post: {
+        "comment_count": Comment.post_id,
+        "image_count": Image.post_id,
+    },
+}
+
+
+def increment(model, row_id: int, counter: str, delta: int = 1) -> None:
+    """Add *delta* to one counter in SQL, inside the caller's transaction."""
+    column = getattr(model, counter)
+    db.session.query(model).filter(model.id == row_id).update(
+        {column: column + delta}, synchronize_session=False
+    )
+
+
+def _counts(model, *counters: str) -> dict:
+    names = counters or COUNTERS[model]
+    return {
+        getattr(model, name): select(func.count())
+        .where(COUNTERS[model][name] == model.id)
+        .correlate(model.__table__)
+        .scalar_subquery()
+        for name in names
+    }
+
+
+def recount(model, row_id: int, *counters: str) -> None:
+    """Recompute *counters* (all by default) of one row from its child tables."""
+    db.session.flush()
+    db.session.query(model).filter(model.id == row_id).update(
+        _counts(model, *counters), synchronize_session=False
+    )
+
+
+def rebuild_counters(commit: bool = True) -> None:
+    """Recompute every counter of every recipe and post in bulk."""
+    for model in COUNTERS:
+        db.session.query(model).update(_counts(model), synchronize_session=False)
+    if commit:
+        db.session.commit()
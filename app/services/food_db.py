@@ -0,0 +1,300 @@
+"""Read-only nutrition dataset compiled into an indexed SQLite file.
+
+The dataset is maintained as a CSV (``NUTRITION_SOURCE_PATH``, one food per
+row with ``|``-separated synonyms) and compiled by ``build_food_database``
+into ``NUTRITION_DB_PATH``:
+
+* ``foods`` holds one row per food with its macros, the basis they are
+  given per (``per_100g``, ``per_cup``, ...) and optional density and piece
+  weight;
+* ``aliases`` maps every normalized name and synonym to its food, as a
+  ``WITHOUT ROWID`` table keyed by the alias.
+
+Workers never load the food rows into Python: each thread opens the file
+read-only with ``mmap_size`` set, so pages are shared between processes
+through the OS page cache. Only the alias keys are read, once per process,
+into a word-level ``FoodMatcher`` that finds the food named in an
+ingredient; its row is then a single primary-key probe.
+The file is rebuilt on first use whenever it is missing or was built from
+a different version of the source.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import unicodedata
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from flask import current_app
+
+from app.core import config
+
+# Bytes of the database file each connection maps into memory
+MMAP_SIZE = 256 * 1024 * 1024
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SOURCE_FIELDS = ("protein", "carbs", "fats", "calories", "grams_per_ml", "grams_per_piece")
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE foods (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    basis TEXT NOT NULL,
+    protein REAL NOT NULL,
+    carbs REAL NOT NULL,
+    fats REAL NOT NULL,
+    calories REAL NOT NULL,
+    grams_per_ml REAL,
+    grams_per_piece REAL
+);
+CREATE TABLE aliases (
+    alias TEXT PRIMARY KEY,
+    food_id INTEGER NOT NULL REFERENCES foods (id)
+) WITHOUT ROWID;
+"""
+
+
+class Food(NamedTuple):
+    name: str
+    basis: str
+    protein: float
+    carbs: float
+    fats: float
+    calories: float
+    grams_per_ml: float | None
+    grams_per_piece: float | None
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercased, accent-free, singular words of *text*.
+
+    Aliases and ingredient names go through the same function, so
+    "Ndolé", "ndole" and "tomatoes"/"tomato" meet on one key.
+    """
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [_singular(w) for w in _WORD_RE.findall(text)]
+
+
+def _optional_float(value: str) -> float | None:
+    value = (value or "").strip()
+    return float(value) if value else None
+
+
+def _source_digest(source: str) -> str:
+    with open(source, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_food_database(source: str, target: str) -> int:
+    """Compile the CSV at *source* into the SQLite file *target*.
+
+    The file is written next to *target* and moved into place atomically,
+    so workers that already have the old file open keep reading it.
+    Returns the number of foods written.
+    """
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target) or ".", suffix=".tmp")
+    os.close(fd)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(_SCHEMA)
+        count = 0
+        with open(source, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                name = row["name"].strip()
+                if not name:
+                    continue
+                values = [_optional_float(row.get(field)) for field in _SOURCE_FIELDS]
+                cur = conn.execute(
+                    "INSERT INTO foods (name, basis, protein, carbs, fats, calories, grams_per_ml, grams_per_piece)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (name, row["basis"].strip(), *(v or 0.0 for v in values[:4]), *values[4:]),
+                )
+                count += 1
+                for alias in [name, *(row.get("synonyms") or "").split("|")]:
+                    words = normalize_words(alias)
+                    if not words:
+                        continue
+                    # The first food listing an alias keeps it
+                    conn.execute(
+                        "INSERT OR IGNORE INTO aliases (alias, food_id) VALUES (?, ?)",
+                        (" ".join(words), cur.lastrowid),
+                    )
+        conn.execute("INSERT INTO meta (key, value) VALUES ('source_digest', ?)", (_source_digest(source),))
+        conn.commit()
+    except BaseException:
+        conn.close()
+        os.unlink(tmp)
+        raise
+    conn.close()
+    os.replace(tmp, target)
+    return count
+
+
+class FoodMatcher:
+    """Aho-Corasick automaton over word sequences.
+
+    Finds every alias occurring in an ingredient's words in a single pass
+    over them, whatever the number of aliases. Matching whole words keeps
+    "pea" out of "peanut". When several match, the longest wins ("sweet
+    potato" over "potato"), then the leftmost.
+    """
+
+    def __init__(self, patterns: Iterable[Sequence[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...] | None] = [None]  # longest pattern ending at each state
+        for pattern in patterns:
+            self._add(tuple(pattern))
+        self._link()
+
+    def _add(self, pattern: Tuple[str, ...]) -> None:
+        state = 0
+        for word in pattern:
+            nxt = self._goto[state].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(None)
+            state = nxt
+        self._out[state] = pattern
+
+    def _link(self) -> None:
+        # depth-1 states keep the root as their failure link
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(word, 0)
+                # a suffix pattern can only be shorter, so keep our own if set
+                if self._out[nxt] is None:
+                    self._out[nxt] = self._out[self._fail[nxt]]
+
+    def longest_match(self, words: Sequence[str]) -> Tuple[str, ...] | None:
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        best = None
+        for word in words:
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            found = out[state]
+            if found is not None and (best is None or len(found) > len(best)):
+                best = found
+        return best
+
+
+class FoodDatabase:
+    """Lazily opened, per-thread read-only connections to the compiled dataset."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._checked_path = None
+        self._digest = None
+        self._matcher = None
+
+    def _paths(self):
+        cfg = current_app.config
+        return (
+            cfg.get("NUTRITION_SOURCE_PATH", config.NUTRITION_SOURCE_PATH),
+            cfg.get("NUTRITION_DB_PATH", config.NUTRITION_DB_PATH),
+        )
+
+    def _ensure_built(self, source: str, path: str) -> None:
+        with self._lock:
+            if self._checked_path == path:
+                return
+            digest = None
+            if os.path.exists(path):
+                try:
+                    conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+                    digest = dict(conn.execute("SELECT key, value FROM meta").fetchall()).get("source_digest")
+                    conn.close()
+                except sqlite3.DatabaseError:
+                    digest = None
+            if digest != _source_digest(source):
+                build_food_database(source, path)
+            self._checked_path = path
+
+    def _connection(self) -> sqlite3.Connection:
+        source, path = self._paths()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.path == path:
+            return conn
+        self._ensure_built(source, path)
+        conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        digest = conn.execute("SELECT value FROM meta WHERE key = 'source_digest'").fetchone()[0]
+        with self._lock:
+            if self._matcher is None or self._digest != digest:
+                aliases = conn.execute("SELECT alias FROM aliases").fetchall()
+                self._matcher = FoodMatcher(alias.split(" ") for (alias,) in aliases)
+                self._digest = digest
+        self._local.conn, self._local.path = conn, path
+        return conn
+
+    def invalidate(self):
+        """Re-check the file against its source on the next lookup."""
+        from app.services.nutrition import _lookup_food
+
+        self._checked_path = None
+        self._local = threading.local()
+        self._matcher = None
+        _lookup_food.cache_clear()
+
+    def source_digest(self) -> str:
+        """Digest of the source the dataset in use was compiled from."""
+        self._connection()
+        return self._digest
+
+    def lookup(self, text: str) -> Food | None:
+        """The food named in *text*, longest alias first, then leftmost.
+
+        The matcher picks the alias in one pass over the words of *text*,
+        so "sweet potato leaves" resolves to "sweet potato" rather than
+        "potato"; the food row is then fetched by that alias.
+        """
+        words = normalize_words(text)
+        if not words:
+            return None
+        conn = self._connection()
+        alias = self._matcher.longest_match(words)
+        if alias is None:
+            return None
+        row = conn.execute(
+            "SELECT f.name, f.basis, f.protein, f.carbs, f.fats, f.calories, f.grams_per_ml, f.grams_per_piece"
+            " FROM aliases a JOIN foods f ON f.id = a.food_id WHERE a.alias = ?",
+            (" ".join(alias),),
+        ).fetchone()
+        return Food(*row) if row else None
+
+
+food_db = FoodDatabase()
@@ -0,0 +1,171 @@
+"""Resized WebP variants of uploaded images.
+
+Once the rows are committed, ``generate_variants`` hands each original to a
+process pool that writes one WebP per ``IMAGE_VARIANT_WIDTHS`` entry next to
+it (``<name>.w640.webp``), never upscaling. When a job finishes, its
+``{width: url}`` map is saved on ``Image.variants``, so requests never wait
+on Pillow. Templates call ``image_url(image, width)`` for the smallest
+variant at least *width* pixels wide; until the variants exist, or if Pillow
+is missing, they get the original.
+"""
+from __future__ import annotations
+
+import functools
+import importlib.util
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Sequence
+
+from flask import current_app
+
+from app.extensions import db
+from app.models.image import Image
+from app.services.upload import upload_service
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def variant_suffix(width: int) -> str:
+    return f".w{width}.webp"
+
+
+def render_variants(source: str, widths: Sequence[int], quality: int) -> list:
+    """Write the WebP variants of *source* next to it and return their widths.
+
+    Runs in a pool process, so it only touches the filesystem.
+    """
+    from PIL import Image as PILImage, ImageOps
+
+    stem = os.path.splitext(source)[0]
+    with PILImage.open(source) as original:
+        # JPEGs decode straight at a reduced scale, never below the largest width
+        original.draft("RGB", (max(widths), max(widths)))
+        img = ImageOps.exif_transpose(original)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if img.has_transparency_data else "RGB")
+        largest = min(max(widths), img.width)
+        targets = sorted({w for w in widths if w < img.width} | {largest})
+        for width in targets:
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), PILImage.LANCZOS, reducing_gap=3.0)
+            # Write then rename, so a reader never sees a half-written variant
+            path = stem + variant_suffix(width)
+            resized.save(path + ".tmp", "WEBP", quality=quality, method=4)
+            os.replace(path + ".tmp", path)
+    return targets
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded web worker with open connections is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config.get("IMAGE_WORKERS", 2),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _variant_map(url: str, widths: Iterable[int]) -> Dict[str, str]:
+    stem = os.path.splitext(url)[0]
+    return {str(width): stem + variant_suffix(width) for width in widths}
+
+
+def _store_variants(app, image_ids: Sequence[int], url: str, future) -> None:
+    try:
+        widths = future.result()
+    except Exception:
+        app.logger.exception(f"Could not generate image variants for {url}")
+        return
+    with app.app_context():
+        Image.query.filter(Image.id.in_(image_ids)).update(
+            {"variants": _variant_map(url, widths)}, synchronize_session=False
+        )
+        db.session.commit()
+
+
+def _submit(images: Iterable[Image]):
+    if importlib.util.find_spec("PIL") is None:
+        current_app.logger.warning("Pillow is not installed; image variants are not generated")
+        return []
+    config = current_app.config
+    widths = tuple(config.get("IMAGE_VARIANT_WIDTHS", (160, 320, 640, 1280)))
+    quality = config.get("IMAGE_VARIANT_QUALITY", 80)
+    images = list(images)
+    # Deduplicated uploads share their blob, and so its variants
+    known = dict(
+        db.session.query(Image.url, Image.variants).filter(
+            Image.url.in_({image.url for image in images}), Image.variants.isnot(None)
+        )
+    )
+    pending: Dict[str, list] = {}
+    for image in images:
+        if image.url in known:
+            Image.query.filter_by(id=image.id).update({"variants": known[image.url]}, synchronize_session=False)
+        else:
+            pending.setdefault(image.url, []).append(image.id)
+    db.session.commit()
+    jobs = []
+    for url, image_ids in pending.items():
+        source = upload_service.local_path(url)
+        if source and os.path.isfile(source):
+            jobs.append((image_ids, url, _pool().submit(render_variants, source, widths, quality)))
+    return jobs
+
+
+def generate_variants(images: Iterable[Image]) -> None:
+    """Queue variant generation for committed *images* without waiting for it."""
+    app = current_app._get_current_object()
+    for image_ids, url, future in _submit(images):
+        future.add_done_callback(functools.partial(_store_variants, app, image_ids, url))
+
+
+def build_missing_variants(batch_size: int = 50) -> int:
+    """Generate variants for every image without them, waiting for each batch."""
+    app = current_app._get_current_object()
+    done, last_id = 0, 0
+    while True:
+        batch = (
+            Image.query.filter(Image.variants.is_(None), Image.id > last_id)
+            .order_by(Image.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return done
+        last_id = batch[-1].id
+        for image_ids, url, future in _submit(batch):
+            future.exception()  # wait
+            _store_variants(app, image_ids, url, future)
+            done += len(image_ids) if future.exception() is None else 0
+
+
+def image_url(image: Image | None, width: int | None = None) -> str:
+    """URL of the smallest variant of *image* at least *width* pixels wide.
+
+    Falls back to the original when no variant is wide enough or none were
+    generated yet; without *width* the original is returned.
+    """
+    if image is None:
+        return ""
+    if width and image.variants:
+        fits = sorted((int(w), url) for w, url in image.variants.items() if int(w) >= width)
+        if fits:
+            return fits[0][1]
+    return image.url
+
+
+def image_srcset(image: Image | None) -> str:
+    """``srcset`` value listing the variants of *image*, empty without any."""
+    if image is None or not image.variants:
+        return ""
+    return ", ".join(f"{url} {w}w" for w, url in sorted((int(w), url) for w, url in image.variants.items()))
+
+
+def register_image_helpers(app) -> None:
+    app.add_template_global(image_url)
+    app.add_template_global(image_srcset)
@@ -0,0 +1,194 @@
+"""Fill empty planner slots so each day lands close to macro targets.
+
+The solver works on the cached macro matrices (see ``app.services.nutrition``)
+and never loops over the whole catalogue in Python:
+
+1. *Pruning*: for every meal type, the deviation of every visible recipe from
+   that meal's share of the daily targets is computed in one vectorized pass
+   and only the best ``CANDIDATES_PER_SLOT`` are kept.
+2. *Greedy start*: days are filled slot by slot with the best candidate that
+   doesn't break the variety rule (no recipe twice within ``no_repeat_days``).
+3. *Local search*: every open slot is revisited and swapped for the candidate
+   that most reduces its day's deviation, until a pass finds nothing better
+   or the time budget runs out.
+"""
+from __future__ import annotations
+
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from flask import current_app
+
+from app.extensions import db
+from app.models.recipe import Recipe
+from app.repository.meal import planned_entries
+from app.services.nutrition import MACRO_COLUMNS, macro_matrix, public_macro_matrix
+
+# Share of the daily targets each meal should cover
+MEAL_SHARES = {"breakfast": 0.25, "lunch": 0.40, "dinner": 0.35}
+CANDIDATES_PER_SLOT = 150
+DEFAULT_BUDGET_MS = 150
+
+Slots = Dict[Tuple[date, str], int]
+
+
+class MacroTargets:
+    """Daily targets; macros left as None don't count towards the deviation."""
+
+    def __init__(self, calories=None, protein=None, carbs=None, fats=None):
+        values = {"calories": calories, "protein": protein, "carbs": carbs, "fats": fats}
+        self.vector = np.array([float(values[c] or 0) for c in MACRO_COLUMNS])
+        self.weights = np.array([1.0 if values[c] else 0.0 for c in MACRO_COLUMNS])
+        self.scale = np.maximum(self.vector, 1.0)
+
+    def __bool__(self):
+        return bool(self.weights.any())
+
+    def deviation(self, totals: np.ndarray, share: float = 1.0) -> np.ndarray:
+        """Weighted squared relative deviation of each row of *totals*."""
+        rel = (totals - self.vector * share) / self.scale
+        return (rel * rel * self.weights).sum(axis=-1)
+
+
+def _visible_matrix(user_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    public_ids, public = public_macro_matrix.get()
+    own_ids, own = macro_matrix(Recipe.query.filter(Recipe.user_id == user_id, Recipe.public == False))
+    return np.concatenate([public_ids, own_ids]), np.concatenate([public, own])
+
+
+def _prune(matrix: np.ndarray, targets: MacroTargets, meal_types: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Row indices of the best candidates for each meal type."""
+    k = min(len(matrix), CANDIDATES_PER_SLOT)
+    best = {}
+    for meal_type in meal_types:
+        cost = targets.deviation(matrix, MEAL_SHARES[meal_type])
+        best[meal_type] = np.argpartition(cost, k - 1)[:k] if k < len(matrix) else np.arange(len(matrix))
+    return best
+
+
+def solve(
+    ids: np.ndarray,
+    matrix: np.ndarray,
+    targets: MacroTargets,
+    days: List[date],
+    open_slots: List[Tuple[int, str]],
+    fixed: List[Tuple[int, int]],
+    no_repeat_days: int,
+    budget_ms: float = DEFAULT_BUDGET_MS,
+) -> Dict[Tuple[int, str], int]:
+    """Assign a recipe id to every ``(day_index, meal_type)`` in *open_slots*.
+
+    *fixed* lists ``(day_index, recipe_id)`` of meals already planned: they
+    count towards their day's totals and the variety rule but never move.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    if not len(ids) or not open_slots:
+        return {}
+    meal_types = sorted({mt for _, mt in open_slots})
+    candidates = _prune(matrix, targets, meal_types)
+
+    # Work on the pooled candidates only: local index -> row of ids/matrix
+    pool = np.unique(np.concatenate(list(candidates.values())))
+    local = {int(row): i for i, row in enumerate(pool)}
+    macros = matrix[pool]
+    slot_candidates = {mt: np.array([local[int(r)] for r in rows]) for mt, rows in candidates.items()}
+    pool_by_id = {int(ids[row]): i for i, row in enumerate(pool)}
+
+    n_days = len(days)
+    totals = np.zeros((n_days, len(MACRO_COLUMNS)))
+    usage = np.zeros((len(pool), n_days), dtype=np.int32)
+    for day, recipe_id in fixed:
+        rows = np.flatnonzero(ids == recipe_id)
+        if len(rows):
+            totals[day] += matrix[rows[0]]
+        if recipe_id in pool_by_id:
+            usage[pool_by_id[recipe_id], day] += 1
+
+    window = max(int(no_repeat_days), 1)
+
+    def blocked(cands: np.ndarray, day: int) -> np.ndarray:
+        lo, hi = max(0, day - window + 1), min(n_days, day + window)
+        return usage[cands, lo:hi].any(axis=1)
+
+    # Greedy start, with the remaining meals of the day assumed on target
+    open_by_day: Dict[int, List[str]] = {}
+    for day, meal_type in open_slots:
+        open_by_day.setdefault(day, []).append(meal_type)
+    assignment: Dict[Tuple[int, str], int] = {}
+    for day in sorted(open_by_day):
+        pending = sorted(open_by_day[day], key=lambda mt: -MEAL_SHARES[mt])
+        for i, meal_type in enumerate(pending):
+            cands = slot_candidates[meal_type]
+            rest = sum(MEAL_SHARES[mt] for mt in pending[i + 1 :])
+            cost = targets.deviation(totals[day] + macros[cands] + targets.vector * rest)
+            repeats = blocked(cands, day)
+            if not repeats.all():
+                # with too few candidates, repeating beats leaving the slot empty
+                cost[repeats] = np.inf
+            pick = cands[int(np.argmin(cost))]
+            assignment[(day, meal_type)] = pick
+            totals[day] += macros[pick]
+            usage[pick, day] += 1
+
+    # Bounded local search: best single-slot replacement, pass after pass
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for (day, meal_type), current in assignment.items():
+            if time.perf_counter() >= deadline:
+                break
+            cands = slot_candidates[meal_type]
+            base = totals[day] - macros[current]
+            usage[current, day] -= 1
+            cost = targets.deviation(base + macros[cands])
+            cost[blocked(cands, day)] = np.inf
+            best = int(np.argmin(cost))
+            current_cost = targets.deviation(base + macros[current])
+            if cost[best] < current_cost - 1e-9:
+                current = assignment[(day, meal_type)] = cands[best]
+                totals[day] = base + macros[current]
+                improved = True
+            usage[current, day] += 1
+
+    return {slot: int(ids[pool[i]]) for slot, i in assignment.items()}
+
+
+def generate_meal_plan(
+    user_id: int,
+    start: date,
+    end: date,
+    targets: MacroTargets,
+    meal_types: Sequence[str],
+    no_repeat_days: int = 3,
+    overwrite: bool = False,
+) -> Slots:
+    """Choose recipes for the user's slots from *start* to *end*.
+
+    Returns ``{(plan_date, meal_type): recipe_id}`` for the caller to write.
+    Meals already planned are kept (and counted) unless *overwrite* is set,
+    in which case those of *meal_types* are chosen again.
+    """
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    index = {d: i for i, d in enumerate(days)}
+    fixed, taken = [], set()
+    for row in planned_entries(user_id, start, end):
+        if overwrite and row.meal_type in meal_types:
+            continue
+        fixed.append((index[row.plan_date], row.recipe_id))
+        taken.add((index[row.plan_date], row.meal_type))
+    open_slots = [(i, mt) for i in range(len(days)) for mt in meal_types if (i, mt) not in taken]
+
+    ids, matrix = _visible_matrix(user_id)
+    budget = current_app.config.get("PLAN_GENERATOR_BUDGET_MS", DEFAULT_BUDGET_MS)
+    chosen = solve(ids, matrix, targets, days, open_slots, fixed, no_repeat_days, budget)
+
+    # The cached public matrix may still list recipes since made private or deleted
+    visible = {
+        row.id
+        for row in db.session.query(Recipe.id).filter(
+            Recipe.id.in_(set(chosen.values())), (Recipe.public == True) | (Recipe.user_id == user_id)
+        )
+    }
+    return {(days[i], mt): rid for (i, mt), rid in chosen.items() if rid in visible}
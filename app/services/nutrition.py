@@ -1,111 +1,148 @@
 from __future__ import annotations
+import hashlib
+import threading
+import time
+from datetime import date
 from dataclasses import dataclass
-from typing import Dict
-
-# Very simple heuristic nutrition database for demo purposes only.
-# Values are approximate and per unit type.
-NUTRITION_DB: Dict[str, Dict[str, Dict[str, float]]] = {
-    # per_100g: grams of macros, calories per 100 g
-    "chicken": {
-        "per_100g": {"protein": 31, "carbs": 0, "fats": 3.6, "calories": 165}
-    },
-    "beef": {"per_100g": {"protein": 26, "carbs": 0, "fats": 15, "calories": 250}},
-    "tofu": {"per_100g": {"protein": 8, "carbs": 2, "fats": 4, "calories": 76}},
-    "egg": {"per_piece": {"protein": 6, "carbs": 0.6, "fats": 5, "calories": 72}},
-    "rice": {"per_cup": {"protein": 4.3, "carbs": 45, "fats": 0.4, "calories": 205}},
-    "pasta": {"per_cup": {"protein": 8, "carbs": 43, "fats": 1.3, "calories": 221}},
-    "bread": {"per_slice": {"protein": 3, "carbs": 12, "fats": 1, "calories": 66}},
-    "avocado": {"per_100g": {"protein": 2, "carbs": 9, "fats": 15, "calories": 160}},
-    "olive oil": {"per_tbsp": {"protein": 0, "carbs": 0, "fats": 14, "calories": 119}},
-    "banana": {"per_piece": {"protein": 1.3, "carbs": 27, "fats": 0.4, "calories": 105}},
-    "milk": {"per_cup": {"protein": 8, "carbs": 12, "fats": 8, "calories": 150}},
-    "yogurt": {"per_cup": {"protein": 9, "carbs": 17, "fats": 4, "calories": 149}},
-    "peanut": {"per_100g": {"protein": 26, "carbs": 16, "fats": 49, "calories": 567}},
-    "bean": {"per_cup": {"protein": 15, "carbs": 45, "fats": 1, "calories": 240}},
-    "fish": {"per_100g": {"protein": 22, "carbs": 0, "fats": 12, "calories": 206}},
-    "potato": {"per_100g": {"protein": 2, "carbs": 17, "fats": 0.1, "calories": 77}},
-    "sweet potato": {"per_100g": {"protein": 1.6, "carbs": 20, "fats": 0, "calories": 86}},
-    "quinoa": {"per_cup": {"protein": 8, "carbs": 39, "fats": 3.5, "calories": 222}},
-    "cheese": {"per_100g": {"protein": 25, "carbs": 1.3, "fats": 33, "calories": 402}},
-    "spinach": {"per_100g": {"protein": 2.9, "carbs": 3.6, "fats": 0.4, "calories": 23}},
-    "tomato": {"per_100g": {"protein": 0.9, "carbs": 3.9, "fats": 0.2, "calories": 18}},
-}
-
-
-def _match_entry(name: str) -> tuple[str, Dict[str, float]] | None:
-    key = name.lower()
-    for token, forms in NUTRITION_DB.items():
-        if token in key:
-            # pick a default representation preference
-            for per_key in ("per_100g", "per_cup", "per_piece", "per_slice", "per_tbsp"):
-                if per_key in forms:
-                    return per_key, forms[per_key]
-    return None
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, or_
+from sqlalchemy.orm import selectinload
+
+from app.extensions import cache, db
+from app.models.meal import MealEntry, MealPlan
+from app.models.recipe import Recipe
+from app.models.recipe_macros import RecipeMacros
+from app.services.food_db import Food, food_db
+from app.services.units import convert_for_food, to_base
+from app.utils.db import insert_ignore
+
+# Bump whenever the estimation rules change so cached RecipeMacros rows are
+# recomputed on their next read. Dataset changes are picked up on their own,
+# see ``nutrition_version``.
+NUTRITION_VERSION = 4
+
+# Column order of the macro matrices used for batch scoring
+MACRO_COLUMNS = ("protein", "carbs", "fats", "calories")
+GOALS = ("high_protein", "low_carb", "balanced")
+
+
+def nutrition_version() -> int:
+    """Version stamped on RecipeMacros rows: the estimation rules combined
+    with the digest of the food dataset they were computed from.
+    """
+    key = f"{NUTRITION_VERSION}:{food_db.source_digest()}".encode()
+    # 28 bits, so it fits the integer column on every backend
+    return int(hashlib.sha256(key).hexdigest()[:7], 16)
+
+
+@lru_cache(maxsize=4096)
+def _lookup_food(name: str) -> Food | None:
+    return food_db.lookup(name)
+
+
+def _zero_macros() -> Dict[str, float]:
+    return {"protein": 0.0, "carbs": 0.0, "fats": 0.0, "calories": 0.0}
+
+
+def macros_for_base(name: str, base_quantity: float | None, base_unit: str | None) -> Dict[str, float]:
+    """Macros of *base_quantity* ``base_unit`` (see ``app.services.units``) of *name*."""
+    food = _lookup_food(name or "")
+    if food is None:
+        return _zero_macros()
+    if not base_quantity:
+        # no quantity given: count one serving of the food's basis
+        factor = 1.0
+    else:
+        factor = convert_for_food(base_quantity, base_unit, food)
+        if factor is None:
+            # a unit like "can" or "bunch": treat as serving count
+            factor = max(base_quantity, 1.0)
+    return {k: getattr(food, k) * factor for k in MACRO_COLUMNS}
 
 
 def estimate_ingredient_macros(name: str, quantity: float | None, unit: str | None) -> Dict[str, float]:
     """Very rough estimate based on name, quantity and unit.
     Returns dict with protein, carbs, fats, calories.
     """
-    quantity = quantity or 0
-    unit = (unit or "").lower()
-
-    match = _match_entry(name)
-    if not match:
-        return {"protein": 0.0, "carbs": 0.0, "fats": 0.0, "calories": 0.0}
-
-    per_key, base = match
-    factor = 1.0
-
-    if per_key == "per_100g":
-        # interpret quantity by grams if unit suggests weight
-        if unit in ("g", "gram", "grams"):
-            factor = (quantity or 0) / 100.0
-        elif unit in ("kg", "kilogram", "kilograms"):
-            factor = (quantity or 0) * 10.0
-        else:
-            # fallback: treat quantity as serving count
-            factor = max(quantity, 1) / 1.0
-    elif per_key == "per_cup":
-        if unit in ("cup", "cups"):
-            factor = quantity or 1.0
-        else:
-            factor = max(quantity, 1.0)
-    elif per_key == "per_piece":
-        if unit in ("piece", "pieces", "pc", "pcs"):
-            factor = quantity or 1.0
-        else:
-            factor = max(quantity, 1.0)
-    elif per_key == "per_slice":
-        if unit in ("slice", "slices"):
-            factor = quantity or 1.0
-        else:
-            factor = max(quantity, 1.0)
-    elif per_key == "per_tbsp":
-        if unit in ("tbsp", "tablespoon", "tablespoons"):
-            factor = quantity or 1.0
-        else:
-            factor = max(quantity, 1.0)
-
-    return {
-        "protein": base["protein"] * factor,
-        "carbs": base["carbs"] * factor,
-        "fats": base["fats"] * factor,
-        "calories": base["calories"] * factor,
-    }
+    return macros_for_base(name, *to_base(quantity, unit))
 
 
-def estimate_recipe_macros(recipe) -> Dict[str, float]:
-    totals = {"protein": 0.0, "carbs": 0.0, "fats": 0.0, "calories": 0.0}
-    for ing in recipe.ingredients:
-        m = estimate_ingredient_macros(ing.name or "", ing.quantity, ing.unit)
+def estimate_recipe_macros(recipe, ingredients=None) -> Dict[str, float]:
+    totals = _zero_macros()
+    for ing in (recipe.ingredients if ingredients is None else ingredients):
+        if ing.base_unit is not None:
+            m = macros_for_base(ing.name, ing.base_quantity, ing.base_unit)
+        else:
+            m = estimate_ingredient_macros(ing.name or "", ing.quantity, ing.unit)
         for k in totals:
             totals[k] += m[k]
     return totals
 
 
-def score_recipe_for_goal(recipe, goal: str) -> float:
-    m = estimate_recipe_macros(recipe)
+def refresh_recipe_macros(recipe, ingredients=None) -> Dict[str, float]:
+    """Recompute and store the cached macros of *recipe* (caller commits).
+
+    Pass *ingredients* when the recipe's ingredient collection is not
+    up to date yet, e.g. right after replacing them in a form handler.
+    """
+    m = estimate_recipe_macros(recipe, ingredients)
+    row = recipe.macros or RecipeMacros(recipe_id=recipe.id)
+    _store_macros(row, m)
+    recipe.macros = row
+    return m
+
+
+def _store_macros(row: RecipeMacros, m: Dict[str, float], version: int | None = None) -> None:
+    row.protein, row.carbs, row.fats, row.calories = m["protein"], m["carbs"], m["fats"], m["calories"]
+    row.nutrition_version = nutrition_version() if version is None else version
+
+
+def load_recipe_macros(recipes: Iterable) -> Dict[int, Dict[str, float]]:
+    """Return ``{recipe_id: macros}`` for *recipes* from the cache.
+
+    Cached rows are fetched in one query; missing or outdated rows are
+    recomputed and committed. Missing rows are inserted with
+    ``insert_ignore``, so concurrent first views of a recipe don't collide.
+    """
+    recipes = list(recipes)
+    ids = [r.id for r in recipes]
+    if not ids:
+        return {}
+    rows = {
+        row.recipe_id: row
+        for row in RecipeMacros.query.filter(RecipeMacros.recipe_id.in_(ids)).all()
+    }
+    version = nutrition_version()
+    result = {}
+    missing = []
+    refreshed = False
+    for recipe in recipes:
+        row = rows.get(recipe.id)
+        if row is not None and row.nutrition_version == version:
+            result[recipe.id] = row.as_dict()
+            continue
+        result[recipe.id] = estimate_recipe_macros(recipe)
+        if row is None:
+            missing.append({"recipe_id": recipe.id, "nutrition_version": version, **result[recipe.id]})
+        else:
+            _store_macros(row, result[recipe.id], version)
+        refreshed = True
+    if refreshed:
+        insert_ignore(RecipeMacros, missing, ["recipe_id"])
+        db.session.commit()
+    return result
+
+
+def recipe_macros(recipe) -> Dict[str, float]:
+    """Cached macros for a single recipe."""
+    return load_recipe_macros([recipe])[recipe.id]
+
+
+def score_macros_for_goal(m: Dict[str, float], goal: str) -> float:
     cals = max(m["calories"], 1)
     if goal == "high_protein":
         return (m["protein"] / cals) * 100
@@ -120,3 +157,169 @@ def score_recipe_for_goal(recipe, goal: str) -> float:
         return -sum(abs(r - (1 / 3)) for r in ratios)
     return 0.0
 
+
+def score_recipe_for_goal(recipe, goal: str) -> float:
+    return score_macros_for_goal(recipe_macros(recipe), goal)
+
+
+def refresh_stale_macros(recipe_query, batch_size: int = 500) -> None:
+    """Compute the cache rows missing or outdated for *recipe_query*'s recipes.
+
+    Recipes are loaded with their ingredients *batch_size* at a time.
+    """
+    stale = (
+        recipe_query.outerjoin(RecipeMacros, RecipeMacros.recipe_id == Recipe.id)
+        .filter(or_(RecipeMacros.recipe_id.is_(None), RecipeMacros.nutrition_version != nutrition_version()))
+        .with_entities(Recipe.id)
+    )
+    stale_ids = [row.id for row in stale.all()]
+    for start in range(0, len(stale_ids), batch_size):
+        batch = (
+            Recipe.query.options(selectinload(Recipe.ingredients))
+            .filter(Recipe.id.in_(stale_ids[start : start + batch_size]))
+            .all()
+        )
+        load_recipe_macros(batch)
+
+
+def macro_matrix(recipe_query, batch_size: int = 500) -> Tuple[np.ndarray, np.ndarray]:
+    """Cached macros of every recipe matched by *recipe_query*.
+
+    Returns ``(ids, matrix)`` where ``matrix[i]`` holds the
+    ``MACRO_COLUMNS`` of recipe ``ids[i]``. Recipes without an up-to-date
+    cache row are computed first, *batch_size* at a time.
+    """
+    refresh_stale_macros(recipe_query, batch_size)
+    rows = (
+        recipe_query.join(RecipeMacros, RecipeMacros.recipe_id == Recipe.id)
+        .with_entities(Recipe.id, *(getattr(RecipeMacros, c) for c in MACRO_COLUMNS))
+        .all()
+    )
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(MACRO_COLUMNS)))
+    data = np.array([tuple(row) for row in rows], dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 1:]
+
+
+def planned_macro_totals(user_id: int, start: date, end: date) -> Dict[date, Dict[str, float]]:
+    """Macro totals of each day *user_id* planned meals for, *start* to *end*.
+
+    Stale cache rows of the planned recipes are refreshed first, then every
+    day is summed in one grouped query over the cache.
+    """
+    planned = (
+        db.session.query(MealEntry.recipe_id)
+        .join(MealPlan, MealPlan.id == MealEntry.meal_plan_id)
+        .filter(MealPlan.user_id == user_id, MealPlan.plan_date.between(start, end))
+    )
+    refresh_stale_macros(Recipe.query.filter(Recipe.id.in_(planned)))
+    rows = (
+        db.session.query(
+            MealPlan.plan_date, *(func.sum(getattr(RecipeMacros, c)).label(c) for c in MACRO_COLUMNS)
+        )
+        .join(MealEntry, MealEntry.meal_plan_id == MealPlan.id)
+        .join(RecipeMacros, RecipeMacros.recipe_id == MealEntry.recipe_id)
+        .filter(MealPlan.user_id == user_id, MealPlan.plan_date.between(start, end))
+        .group_by(MealPlan.plan_date)
+        .all()
+    )
+    return {row.plan_date: {c: float(getattr(row, c) or 0) for c in MACRO_COLUMNS} for row in rows}
+
+
+class PublicMacroMatrix:
+    """Per-worker copy of ``macro_matrix`` over all public recipes.
+
+    Reloaded at most every ``MACRO_MATRIX_REFRESH_SECONDS`` so batch scoring
+    doesn't have to pull the whole catalogue out of the database on every
+    request.
+    """
+
+    def __init__(self):
+        self._value = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def get(self) -> Tuple[np.ndarray, np.ndarray]:
+        ttl = current_app.config.get("MACRO_MATRIX_REFRESH_SECONDS", 60)
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < ttl:
+            return self._value
+        with self._lock:
+            if self._loaded_at is None or now - self._loaded_at >= ttl:
+                self._value = macro_matrix(Recipe.query.filter(Recipe.public == True))
+                self._loaded_at = now
+        return self._value
+
+
+public_macro_matrix = PublicMacroMatrix()
+
+
+def score_matrix_for_goal(matrix: np.ndarray, goal: str) -> np.ndarray:
+    """Vectorized ``score_macros_for_goal`` over an (n x 4) macro matrix."""
+    protein, carbs, fats, calories = matrix.T
+    cals = np.maximum(calories, 1)
+    if goal == "high_protein":
+        return (protein / cals) * 100
+    if goal == "low_carb":
+        return -(carbs / cals) * 100
+    if goal == "balanced":
+        total = matrix[:, :3].sum(axis=1)
+        total[total == 0] = 1
+        ratios = matrix[:, :3] / total[:, None]
+        return -np.abs(ratios - (1 / 3)).sum(axis=1)
+    return np.zeros(len(matrix))
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the *k* highest scores, best first, without a full sort."""
+    if k <= 0 or not len(scores):
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+@cache.memoize(ttl=60)
+def public_goal_ranking(goal: str, k: int) -> List[Tuple[int, float]]:
+    """``[(recipe_id, score)]`` of the *k* best public recipes for *goal*.
+
+    Shared by every user, so with a shared cache backend only one worker
+    scores the public matrix per minute.
+    """
+    public_ids, public = public_macro_matrix.get()
+    scores = score_matrix_for_goal(public, goal)
+    return [(int(public_ids[i]), float(scores[i])) for i in top_k(scores, k)]
+
+
+def top_recipes_for_goal(user_id: int, goal: str, k: int = 10):
+    """Return ``[(recipe, score)]`` for the *k* best recipes visible to *user_id*.
+
+    Public recipes come from the cached ranking, the user's private ones are
+    read and scored live, then both are merged.
+    """
+    # Oversample: the cached ranking may still list recipes since deleted or made private
+    ranked = public_goal_ranking(goal, k * 2)
+    own_ids, own = macro_matrix(Recipe.query.filter(Recipe.user_id == user_id, Recipe.public == False))
+    own_scores = score_matrix_for_goal(own, goal)
+    own_ranked = [(int(own_ids[i]), float(own_scores[i])) for i in top_k(own_scores, k * 2)]
+    # A recipe made private within the ranking's TTL shows up on both sides
+    best: Dict[int, float] = {}
+    for rid, score in ranked + own_ranked:
+        if score > best.get(rid, float("-inf")):
+            best[rid] = score
+    ranked = sorted(best.items(), key=lambda pair: -pair[1])
+    best_ids = [rid for rid, _ in ranked[: k * 2]]
+    scores = [score for _, score in ranked[: k * 2]]
+    recipes = {
+        r.id: r
+        for r in Recipe.query.filter(
+            Recipe.id.in_(best_ids), (Recipe.public == True) | (Recipe.user_id == user_id)
+        ).all()
+    }
+    scored = [(recipes[rid], score) for rid, score in zip(best_ids, scores) if rid in recipes]
+    return scored[:k]
@@ -0,0 +1,70 @@
+"""Random recipe recommendations without ``ORDER BY random()``.
+
+Each worker keeps a compact array of public recipe ids, reloaded at most
+every ``RECOMMENDATION_REFRESH_SECONDS``. Picking N recipes samples ids from
+that array and loads them by primary key, so the database never has to sort
+the catalogue. The load re-checks ``Recipe.public`` and drops ids whose row
+is gone, so recipes made private or deleted since the last refresh are never
+recommended.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from array import array
+from typing import List
+
+from flask import current_app
+
+from app.extensions import db
+from app.models.recipe import Recipe
+
+DEFAULT_REFRESH_SECONDS = 300
+
+
+class RecipeSampler:
+    def __init__(self):
+        self._ids = array("q")
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Force the next sample to reload the id array."""
+        self._loaded_at = None
+
+    def _public_ids(self) -> array:
+        ttl = current_app.config.get("RECOMMENDATION_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS)
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < ttl:
+            return self._ids
+        with self._lock:
+            if self._loaded_at is None or now - self._loaded_at >= ttl:
+                rows = db.session.query(Recipe.id).filter(Recipe.public == True).all()
+                self._ids = array("q", (row.id for row in rows))
+                self._loaded_at = now
+        return self._ids
+
+    def _load(self, ids: array, n: int) -> tuple[List[Recipe], bool]:
+        # Oversample so stale ids (deleted or made private) don't shrink the result
+        picked = random.sample(ids, min(len(ids), n * 2))
+        recipes = Recipe.query.filter(Recipe.id.in_(picked), Recipe.public == True).all()
+        by_id = {r.id: r for r in recipes}
+        return [by_id[i] for i in picked if i in by_id][:n], len(by_id) < len(picked)
+
+    def sample(self, n: int) -> List[Recipe]:
+        """Return up to *n* distinct random public recipes."""
+        ids = self._public_ids()
+        if not ids or n <= 0:
+            return []
+        recipes, saw_stale = self._load(ids, n)
+        if len(recipes) < n and saw_stale:
+            # Too many stale ids to fill the sample: reload the array once
+            self.invalidate()
+            ids = self._public_ids()
+            if ids:
+                recipes, _ = self._load(ids, n)
+        return recipes
+
+
+recipe_sampler = RecipeSampler()
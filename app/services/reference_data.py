@@ -0,0 +1,120 @@
+"""Per-worker cache of the category and origin lookup tables.
+
+Categories and origins change only when ``seed_data.py`` runs, yet almost
+every page lists them and every ``RecipeForm`` builds its choices from them.
+Each worker loads both tables once into plain tuples (safe to share across
+requests and threads) and only re-reads them when the ``reference`` row of
+``cache_versions`` changes. That row is checked at most every
+``REFERENCE_DATA_CHECK_SECONDS``; writers call ``bump_reference_version``
+in the transaction that changes the tables.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+from flask import current_app
+
+from app.extensions import db
+from app.models.cache_version import CacheVersion
+from app.models.category import Category
+from app.models.origin import Origin
+from app.utils.db import insert_ignore
+
+VERSION_KEY = "reference"
+DEFAULT_CHECK_SECONDS = 30
+
+
+class CategoryRef(NamedTuple):
+    id: int
+    name: str
+
+
+class OriginRef(NamedTuple):
+    id: int
+    country: str | None
+    culture: str | None
+    tribe: str | None
+
+
+class _Snapshot(NamedTuple):
+    version: int
+    categories: Tuple[CategoryRef, ...]
+    origins: Tuple[OriginRef, ...]
+    categories_by_name: Dict[str, CategoryRef]
+
+
+def _stored_version() -> int:
+    row = db.session.query(CacheVersion.version).filter(CacheVersion.name == VERSION_KEY).first()
+    return row.version if row else 0
+
+
+class ReferenceData:
+    def __init__(self):
+        self._snapshot: _Snapshot | None = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the snapshot so the next read reloads both tables."""
+        self._snapshot = None
+
+    def _get(self) -> _Snapshot:
+        ttl = current_app.config.get("REFERENCE_DATA_CHECK_SECONDS", DEFAULT_CHECK_SECONDS)
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < ttl:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or now - self._checked_at >= ttl:
+                version = _stored_version()
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._load(version)
+                self._snapshot, self._checked_at = snapshot, now
+        return snapshot
+
+    @staticmethod
+    def _load(version: int) -> _Snapshot:
+        categories = tuple(
+            CategoryRef(*row) for row in db.session.query(Category.id, Category.name).order_by(Category.id)
+        )
+        origins = tuple(
+            OriginRef(*row)
+            for row in db.session.query(Origin.id, Origin.country, Origin.culture, Origin.tribe).order_by(Origin.id)
+        )
+        return _Snapshot(version, categories, origins, {c.name: c for c in categories})
+
+    @property
+    def version(self) -> int:
+        return self._get().version
+
+    @property
+    def categories(self) -> Tuple[CategoryRef, ...]:
+        return self._get().categories
+
+    @property
+    def origins(self) -> Tuple[OriginRef, ...]:
+        return self._get().origins
+
+    def category_by_name(self, name: str) -> CategoryRef | None:
+        return self._get().categories_by_name.get(name)
+
+    def category_choices(self) -> List[Tuple[int, str]]:
+        return [(0, '-- Select Category --')] + [(c.id, c.name) for c in self.categories]
+
+    def origin_choices(self) -> List[Tuple[int, str]]:
+        return [(0, '-- Select Origin --')] + [(o.id, o.country) for o in self.origins]
+
+
+def bump_reference_version() -> None:
+    """Mark categories/origins as changed for every worker (caller commits)."""
+    insert_ignore(CacheVersion, [{"name": VERSION_KEY, "version": 0}], ["name"])
+    db.session.query(CacheVersion).filter(CacheVersion.name == VERSION_KEY).update(
+        {CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False
+    )
+    reference_data.invalidate()
+
+
+reference_data = ReferenceData()
@@ -0,0 +1,144 @@
+"""Full-text search over recipe names and descriptions.
+
+SQLite keeps a standalone FTS5 table (``recipe_search``) whose rowid is the
+recipe id; it is written by the dashboard views whenever a recipe is created,
+edited or deleted. PostgreSQL uses a GIN expression index over the recipe's
+tsvector, which the database keeps in sync on its own. Any other backend falls
+back to the old ``LIKE`` scan.
+"""
+from __future__ import annotations
+
+import re
+from typing import List
+
+from flask import current_app
+from sqlalchemy import Float, Integer, desc, false, func, or_, text
+
+from app.extensions import db
+from app.models.recipe import Recipe
+
+FTS_TABLE = "recipe_search"
+PG_INDEX = "ix_recipes_search_vector"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _dialect() -> str:
+    return db.session.get_bind().dialect.name
+
+
+def _tokens(term: str) -> List[str]:
+    return _TOKEN_RE.findall(term.lower())
+
+
+def _pg_document():
+    return func.to_tsvector(
+        "simple",
+        func.coalesce(Recipe.name, "") + " " + func.coalesce(Recipe.description, ""),
+    )
+
+
+def ensure_search_index() -> None:
+    """Create the search index for the current database if it is missing.
+
+    The SQLite table is backfilled from ``recipes`` the first time it is
+    created, so existing catalogues become searchable without a migration.
+    """
+    dialect = _dialect()
+    if dialect == "sqlite":
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        if exists:
+            return
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "name, description, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        rebuild_search_index(commit=False)
+        db.session.commit()
+        current_app.logger.info(f"Created {FTS_TABLE} full-text index")
+    elif dialect == "postgresql":
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON recipes USING gin ("
+            "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, '')))"
+        ))
+        db.session.commit()
+
+
+def rebuild_search_index(commit: bool = True) -> None:
+    """Repopulate the SQLite FTS table from scratch (no-op elsewhere)."""
+    if _dialect() != "sqlite":
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    db.session.execute(text(
+        f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+        "SELECT id, name, coalesce(description, '') FROM recipes"
+    ))
+    if commit:
+        db.session.commit()
+
+
+def index_recipe(recipe: Recipe) -> None:
+    """Write *recipe* into the index inside the caller's transaction.
+
+    The recipe must already have an id (flush before calling).
+    """
+    if _dialect() != "sqlite":
+        return
+    remove_recipe(recipe.id)
+    db.session.execute(
+        text(f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (:id, :name, :description)"),
+        {"id": recipe.id, "name": recipe.name or "", "description": recipe.description or ""},
+    )
+
+
+def remove_recipe(recipe_id: int) -> None:
+    """Drop a recipe from the index inside the caller's transaction."""
+    if _dialect() != "sqlite":
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": recipe_id})
+
+
+def search_recipes(query, term: str, ranked: bool = True):
+    """Restrict a ``Recipe`` query to rows matching *term*.
+
+    Every word of *term* must appear as a word prefix in the name or the
+    description. When *ranked* is true the query is ordered by relevance
+    (best first, newest first on ties); otherwise ordering is left to the
+    caller.
+    """
+    tokens = _tokens(term)
+    if not tokens:
+        return query.filter(false())
+
+    dialect = _dialect()
+    if dialect == "sqlite":
+        match = " ".join(f'"{t}"*' for t in tokens)
+        hits = (
+            text(f"SELECT rowid AS recipe_id, bm25({FTS_TABLE}) AS rank "
+                 f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match")
+            .bindparams(match=match)
+            .columns(recipe_id=Integer, rank=Float)
+            .subquery("search_hits")
+        )
+        query = query.join(hits, hits.c.recipe_id == Recipe.id)
+        if ranked:
+            # bm25() is lower-is-better
+            query = query.order_by(hits.c.rank.asc(), desc(Recipe.created_at))
+        return query
+
+    if dialect == "postgresql":
+        ts_query = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in tokens))
+        document = _pg_document()
+        query = query.filter(document.op("@@")(ts_query))
+        if ranked:
+            query = query.order_by(desc(func.ts_rank(document, ts_query)), desc(Recipe.created_at))
+        return query
+
+    for token in tokens:
+        query = query.filter(or_(Recipe.name.contains(token), Recipe.description.contains(token)))
+    if ranked:
+        query = query.order_by(desc(Recipe.created_at))
+    return query
@@ -0,0 +1,118 @@
+"""Materialized community timeline.
+
+Publishing a recipe or a post writes one ``(created_at, kind, ref_id)`` row
+to ``timeline`` inside the caller's transaction; making a recipe private or
+deleting it removes the row. The feed reads the newest rows with one range
+scan over ``ix_timeline_created_at_id`` and hydrates them with one batched
+``SELECT ... IN`` per kind and relationship, so its cost no longer grows
+with the number of comments on popular recipes.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from app.extensions import db
+from app.models.comment import Comment
+from app.models.post import Post
+from app.models.recipe import Recipe
+from app.models.timeline import TimelineEntry
+from app.utils.db import insert_ignore
+from app.utils.pagination import KeysetPage, keyset_paginate
+
+RECIPE = "recipe"
+POST = "post"
+
+
+def publish(kind: str, ref_id: int, created_at: datetime | None = None) -> None:
+    """Add an item to the timeline (caller commits); already listed items are kept."""
+    insert_ignore(
+        TimelineEntry,
+        [{"kind": kind, "ref_id": ref_id, "created_at": created_at or datetime.utcnow()}],
+        ["kind", "ref_id"],
+    )
+
+
+def retract(kind: str, ref_id: int) -> None:
+    """Remove an item from the timeline (caller commits)."""
+    TimelineEntry.query.filter_by(kind=kind, ref_id=ref_id).delete(synchronize_session=False)
+
+
+def sync_recipe(recipe: Recipe) -> None:
+    """List *recipe* if it is public, unlist it otherwise.
+
+    The recipe must already have an id (flush before calling).
+    """
+    if recipe.public:
+        publish(RECIPE, recipe.id, recipe.created_at)
+    else:
+        retract(RECIPE, recipe.id)
+
+
+def _hydrate(kind: str, ids: List[int], compact: bool) -> Dict[int, object]:
+    if not ids:
+        return {}
+    if kind == RECIPE:
+        options = [selectinload(Recipe.images), selectinload(Recipe.author), selectinload(Recipe.category)]
+        if not compact:
+            options.append(selectinload(Recipe.comments).selectinload(Comment.author))
+        query = Recipe.query.options(*options).filter(Recipe.id.in_(ids), Recipe.public == True)
+    else:
+        query = Post.query.options(
+            selectinload(Post.images),
+            selectinload(Post.author),
+        ).filter(Post.id.in_(ids), Post.status == "published")
+    return {item.id: item for item in query}
+
+
+def feed_page(cursor: str | None = None, per_page: int = 20, compact: bool = False) -> KeysetPage:
+    """One slice of the timeline, newest first, as hydrated recipes and posts.
+
+    *cursor* is the ``next_cursor`` of the previous page. Full items carry
+    their comments and authors for the server-rendered cards; *compact* ones
+    skip the comments and rely on the ``comment_count`` column.
+    """
+    page = keyset_paginate(
+        db.session.query(TimelineEntry.id, TimelineEntry.created_at, TimelineEntry.kind, TimelineEntry.ref_id),
+        TimelineEntry.created_at,
+        TimelineEntry.id,
+        True,
+        cursor,
+        per_page,
+    )
+    loaded = {
+        kind: _hydrate(kind, [row.ref_id for row in page.items if row.kind == kind], compact)
+        for kind in (RECIPE, POST)
+    }
+    # Items unpublished outside the hooks are skipped rather than shown
+    page.items = [loaded[row.kind][row.ref_id] for row in page.items if row.ref_id in loaded.get(row.kind, {})]
+    return page
+
+
+def rebuild_timeline(commit: bool = True) -> int:
+    """Repopulate the timeline from public recipes and published posts."""
+    TimelineEntry.query.delete(synchronize_session=False)
+    recipes = db.session.query(Recipe.id, Recipe.created_at).filter(Recipe.public == True)
+    posts = db.session.query(Post.id, Post.created_at).filter(Post.status == "published")
+    rows = [
+        {"kind": kind, "ref_id": row.id, "created_at": row.created_at or datetime.utcnow()}
+        for kind, query in ((RECIPE, recipes), (POST, posts))
+        for row in query
+    ]
+    if rows:
+        db.session.execute(TimelineEntry.__table__.insert(), rows)
+    if commit:
+        db.session.commit()
+    return len(rows)
+
+
+def ensure_timeline() -> None:
+    """Backfill an empty timeline so existing content shows up without a migration."""
+    if db.session.query(TimelineEntry.id).first() is not None:
+        return
+    count = rebuild_timeline()
+    if count:
+        current_app.logger.info(f"Backfilled {count} timeline entries")
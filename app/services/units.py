@@ -0,0 +1,168 @@
+"""Unit registry used to turn free-text ingredient quantities into base amounts.
+
+Every known unit belongs to one dimension and converts to that dimension's
+base unit (``g`` for mass, ``ml`` for volume, ``piece`` for counts). Units
+that measure nothing convertible ("can", "bunch", ...) are their own base.
+Ingredients store the resolved ``base_quantity``/``base_unit`` when they are
+saved, so nutrition and grocery totals are plain arithmetic on read.
+"""
+from __future__ import annotations
+
+from typing import Dict, NamedTuple, Tuple
+
+from app.services.food_db import Food, normalize_words
+
+MASS, VOLUME, COUNT = "mass", "volume", "count"
+BASE_UNITS = {MASS: "g", VOLUME: "ml", COUNT: "piece"}
+
+
+class Unit(NamedTuple):
+    name: str
+    dimension: str | None
+    factor: float  # base units per one of this unit
+
+
+# canonical name -> (dimension, factor to the dimension's base unit)
+UNITS: Dict[str, Tuple[str | None, float]] = {
+    "mg": (MASS, 0.001),
+    "g": (MASS, 1.0),
+    "kg": (MASS, 1000.0),
+    "oz": (MASS, 28.3495),
+    "lb": (MASS, 453.592),
+    "ml": (VOLUME, 1.0),
+    "cl": (VOLUME, 10.0),
+    "dl": (VOLUME, 100.0),
+    "l": (VOLUME, 1000.0),
+    "pinch": (VOLUME, 0.3),
+    "dash": (VOLUME, 0.6),
+    "tsp": (VOLUME, 5.0),
+    "tbsp": (VOLUME, 15.0),
+    "fl oz": (VOLUME, 29.5735),
+    "cup": (VOLUME, 240.0),
+    "glass": (VOLUME, 250.0),
+    "pint": (VOLUME, 473.176),
+    "quart": (VOLUME, 946.353),
+    "gallon": (VOLUME, 3785.41),
+    "piece": (COUNT, 1.0),
+    "dozen": (COUNT, 12.0),
+    "slice": (None, 1.0),
+    "can": (None, 1.0),
+    "bunch": (None, 1.0),
+    "handful": (None, 1.0),
+    "packet": (None, 1.0),
+}
+
+# Spellings (after normalize_words, so singular, lowercase, accent-free)
+ALIASES: Dict[str, str] = {
+    "milligram": "mg", "milligramme": "mg",
+    "gr": "g", "gram": "g", "gramme": "g",
+    "kgs": "kg", "kilo": "kg", "kilogram": "kg", "kilogramme": "kg",
+    "ounce": "oz",
+    "lbs": "lb", "pound": "lb",
+    "milliliter": "ml", "millilitre": "ml",
+    "centiliter": "cl", "centilitre": "cl",
+    "deciliter": "dl", "decilitre": "dl",
+    "liter": "l", "litre": "l", "ltr": "l",
+    "pincee": "pinch",
+    "teaspoon": "tsp", "cac": "tsp", "c a cafe": "tsp", "cuillere a cafe": "tsp",
+    "tablespoon": "tbsp", "tbs": "tbsp", "tbl": "tbsp", "cas": "tbsp", "c a soupe": "tbsp",
+    "cuillere a soupe": "tbsp",
+    "fluid ounce": "fl oz", "floz": "fl oz",
+    "c": "cup", "tasse": "cup",
+    "verre": "glass",
+    "pt": "pint", "qt": "quart", "gal": "gallon",
+    "pc": "piece", "pcs": "piece", "whole": "piece", "each": "piece",
+    "unit": "piece", "unite": "piece", "clove": "piece", "gousse": "piece", "gouss": "piece",
+    "douzaine": "dozen",
+    "tranche": "slice", "tranch": "slice",
+    "tin": "can", "boite": "can",
+    "botte": "bunch", "poignee": "handful", "pack": "packet", "sachet": "packet",
+}
+
+DEFAULT_GRAMS_PER_ML = 1.0
+DEFAULT_GRAMS_PER_PIECE = 100.0
+
+# Amount of the food each nutrition basis refers to
+BASIS_AMOUNTS = {
+    "per_100g": (MASS, 100.0),
+    "per_cup": (VOLUME, 240.0),
+    "per_tbsp": (VOLUME, 15.0),
+    "per_piece": (COUNT, 1.0),
+    "per_slice": (COUNT, 1.0),
+}
+
+
+def resolve_unit(unit: str | None) -> Unit:
+    """Look *unit* up in the registry.
+
+    A missing unit counts pieces ("2 eggs"); an unknown one becomes its own
+    dimensionless unit, keyed by its normalized spelling.
+    """
+    key = " ".join(normalize_words(unit))
+    if not key:
+        return Unit("piece", COUNT, 1.0)
+    key = ALIASES.get(key, key)
+    if key in UNITS:
+        return Unit(key, *UNITS[key])
+    return Unit(key[:20], None, 1.0)
+
+
+def to_base(quantity: float | None, unit: str | None) -> Tuple[float | None, str]:
+    """Return ``(base_quantity, base_unit)`` for a raw quantity and unit."""
+    resolved = resolve_unit(unit)
+    base_unit = BASE_UNITS.get(resolved.dimension, resolved.name)
+    if quantity is None:
+        return None, base_unit
+    return quantity * resolved.factor, base_unit
+
+
+def apply_base_quantity(ingredient) -> None:
+    """Fill ``ingredient.base_quantity``/``base_unit`` from its raw fields."""
+    ingredient.base_quantity, ingredient.base_unit = to_base(ingredient.quantity, ingredient.unit)
+
+
+def dimension_of(base_unit: str | None) -> str | None:
+    for dimension, base in BASE_UNITS.items():
+        if base == base_unit:
+            return dimension
+    return None
+
+
+def convert_for_food(amount: float, base_unit: str | None, food: Food) -> float | None:
+    """How many of *food*'s nutrition basis *amount* ``base_unit`` is.
+
+    Mass and volume convert through the food's density, counts through its
+    piece weight (the slice weight for ``per_slice`` foods). Foods without a
+    density are taken to weigh about as much as water, and a piece of a food
+    without a piece weight counts as one serving. Returns None for units
+    without a dimension that the basis doesn't use either.
+    """
+    target, per = BASIS_AMOUNTS[food.basis]
+    source = dimension_of(base_unit)
+    if source is None:
+        # "2 slice" of a per_slice food
+        return amount if food.basis == f"per_{base_unit}" else None
+    if source == target:
+        return amount / per
+    if source == COUNT and not food.grams_per_piece:
+        return amount
+    grams = amount * _grams_per(source, food)
+    return grams / _grams_per(target, food) / per
+
+
+def _grams_per(dimension: str, food: Food) -> float:
+    if dimension == VOLUME:
+        return food.grams_per_ml or DEFAULT_GRAMS_PER_ML
+    if dimension == COUNT:
+        return food.grams_per_piece or DEFAULT_GRAMS_PER_PIECE
+    return 1.0
+
+
+def display_quantity(base_quantity: float | None, base_unit: str | None) -> Tuple[float | None, str]:
+    """Scale a base amount to a readable unit (1500 g -> 1.5 kg)."""
+    if base_quantity is not None:
+        if base_unit == "g" and base_quantity >= 1000:
+            return base_quantity / 1000, "kg"
+        if base_unit == "ml" and base_quantity >= 1000:
+            return base_quantity / 1000, "l"
+    return base_quantity, base_unit or ""
@@ -1,3 +1,5 @@
+from .base import UploadError
+from .content_addressed import ContentAddressedUploadService
 from .local import LocalUploadService
 
-upload_service = LocalUploadService()
+upload_service = ContentAddressedUploadService()
@@ -1,3 +1,23 @@
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+
+from werkzeug.utils import secure_filename
+
+from app.extensions import db
+from app.models.upload_session import UploadSession
+
+# Chunks are copied from the request stream to disk in blocks of this size
+COPY_BLOCK_SIZE = 1024 * 1024
+# Resized copies (see app.services.images) are named <stem>.w<width>.webp
+VARIANT_PATTERN = re.compile(r"\.w\d+\.webp$")
+
+
+class UploadError(ValueError):
+    """A resumable upload request the client has to correct."""
+
+
 class UploadService:
     def upload_file(self, file_storage):
         """Upload a Werkzeug FileStorage and return (success, public_url)."""
@@ -6,3 +26,104 @@ class UploadService:
     def delete_file(self, url: str) -> bool:
         """Delete a file by its public URL. Return True on success."""
         raise NotImplementedError
+
+    def serve(self, filename: str):
+        """Return the response for GET /uploads/<filename>."""
+        raise NotImplementedError
+
+    def local_path(self, url: str):
+        """Filesystem path of the upload at *url*, or None if it isn't stored locally."""
+        raise NotImplementedError
+
+    def store_file(self, path: str, filename: str) -> str:
+        """Move a finished local file at *path* into storage and return its public URL."""
+        raise NotImplementedError
+
+    def partial_path(self, upload_id: str) -> str:
+        """Local file the chunks of upload *upload_id* are written to."""
+        raise NotImplementedError
+
+    # -- resumable uploads ------------------------------------------------
+    #
+    # create_session() -> write_chunk() until received == size -> complete_session(),
+    # then a form submits the session id and its view calls claim_upload().
+    # Each chunk is streamed from the request body to the partial file, so
+    # memory stays bounded whatever the file size. The caller commits.
+
+    def create_session(self, user_id: int, filename: str, size: int, extensions, max_size: int) -> UploadSession:
+        name = secure_filename(filename or "")
+        ext = name.rsplit(".", 1)[1].lower() if "." in name else ""
+        if ext not in extensions:
+            raise UploadError(f"Unsupported file type. Allowed: {', '.join(sorted(extensions))}")
+        if size <= 0 or size > max_size:
+            raise UploadError(f"File must be between 1 byte and {max_size // (1024 * 1024)}MB")
+        session = UploadSession(id=uuid.uuid4().hex, user_id=user_id, filename=name, size=size, received=0)
+        path = self.partial_path(session.id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "wb").close()
+        db.session.add(session)
+        return session
+
+    def write_chunk(self, session: UploadSession, offset: int, stream, length: int) -> int:
+        """Write *length* bytes of *stream* at *offset* and return the bytes received so far.
+
+        A chunk may start anywhere up to ``received``, so a client that lost
+        a response can resend it. A short body (dropped connection) still
+        counts what arrived; the client resumes from the returned offset.
+        """
+        if session.complete:
+            raise UploadError("Upload already completed")
+        if offset < 0 or offset > session.received:
+            raise UploadError(f"Chunk must start at or before byte {session.received}")
+        if offset + length > session.size:
+            raise UploadError("Chunk runs past the declared file size")
+        written = 0
+        with open(self.partial_path(session.id), "r+b") as fh:
+            fh.seek(offset)
+            while written < length:
+                block = stream.read(min(COPY_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                fh.write(block)
+                written += len(block)
+        session.received = max(session.received, offset + written)
+        session.updated_at = datetime.utcnow()
+        return session.received
+
+    def complete_session(self, session: UploadSession) -> str:
+        """Store a fully received upload and return its public URL."""
+        if session.complete:
+            return session.url
+        if session.received != session.size:
+            raise UploadError(f"Upload incomplete: {session.received} of {session.size} bytes received")
+        session.url = self.store_file(self.partial_path(session.id), session.filename)
+        return session.url
+
+    def claim_upload(self, upload_id: str, user_id: int):
+        """URL of the user's completed upload *upload_id*, or None.
+
+        The session is deleted with the caller's transaction, so the same
+        upload can't be attached twice and a failed save leaves it claimable.
+        """
+        session = db.session.get(UploadSession, upload_id) if upload_id else None
+        if session is None or session.user_id != user_id or not session.complete:
+            return None
+        db.session.delete(session)
+        return session.url
+
+    def purge_sessions(self, max_age: timedelta) -> int:
+        """Drop sessions idle for longer than *max_age* with their files."""
+        stale = UploadSession.query.filter(UploadSession.updated_at < datetime.utcnow() - max_age).all()
+        # completed but never attached to a recipe
+        orphans = [session.url for session in stale if session.complete]
+        for session in stale:
+            if not session.complete:
+                try:
+                    os.remove(self.partial_path(session.id))
+                except OSError:
+                    pass
+            db.session.delete(session)
+        db.session.commit()
+        for url in orphans:
+            self.delete_file(url)
+        return len(stale)
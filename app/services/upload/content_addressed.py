@@ -0,0 +1,145 @@
+import glob
+import hashlib
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from sqlalchemy import func
+from werkzeug.utils import secure_filename
+
+from app.extensions import db
+from app.models.image import Image
+from app.models.post import Post
+from app.models.upload_session import UploadSession
+from app.models.video import Video
+
+from .base import COPY_BLOCK_SIZE, VARIANT_PATTERN
+from .local import LocalUploadService
+
+# A reused blob may be about to get its first row: its mtime is pushed this far
+# into the future as a lease, and delete_file leaves leased blobs alone
+REUSE_GRACE_SECONDS = 3600
+
+
+class ContentAddressedUploadService(LocalUploadService):
+    """Store each distinct file once, named after the SHA-256 of its bytes.
+
+    Uploads are hashed while they are copied to a temporary file, which then
+    becomes ``<digest><ext>`` unless that blob already exists. Identical files
+    therefore share one file and one immutable URL. Blobs are reference
+    counted through the ``Image``/``Video`` rows that point at them (plus
+    unclaimed upload sessions): ``delete_file`` only removes a blob, and its
+    resized variants, once nothing references it any more.
+    """
+
+    def upload_file(self, file_storage):
+        if not file_storage or not getattr(file_storage, "filename", ""):
+            return False, ""
+        fd, temp_path = tempfile.mkstemp(dir=self._ensure_upload_dir(), prefix=".incoming-")
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                while True:
+                    block = file_storage.stream.read(COPY_BLOCK_SIZE)
+                    if not block:
+                        break
+                    digest.update(block)
+                    fh.write(block)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return True, self._commit_blob(temp_path, digest.hexdigest(), file_storage.filename)
+
+    def store_file(self, path: str, filename: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(COPY_BLOCK_SIZE), b""):
+                digest.update(block)
+        return self._commit_blob(path, digest.hexdigest(), filename)
+
+    def _commit_blob(self, temp_path: str, digest: str, filename: str) -> str:
+        ext = os.path.splitext(secure_filename(filename))[1].lower()
+        url = f"/uploads/{digest}{ext}"
+        target = self.local_path(url)
+        if os.path.exists(target):
+            os.remove(temp_path)
+            # Keeps a concurrent delete_file away until our row is committed
+            lease = time.time() + REUSE_GRACE_SECONDS
+            os.utime(target, (lease, lease))
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temp_path, target)
+        return url
+
+    # -- reference counting -----------------------------------------------
+
+    @staticmethod
+    def _image_refs():
+        # Rows whose owner was deleted without them don't keep a blob alive
+        return Image.recipe.has() | Image.step.has() | Image.ingredient.has() | Image.post.has()
+
+    @staticmethod
+    def _video_refs():
+        return Video.recipe.has() | Video.post_id.in_(db.session.query(Post.id))
+
+    def reference_count(self, url: str) -> int:
+        """Rows that point at the blob behind *url*."""
+        queries = (
+            db.session.query(func.count(Image.id)).filter(Image.url == url, self._image_refs()),
+            db.session.query(func.count(Video.id)).filter(Video.video_url == url, self._video_refs()),
+            db.session.query(func.count(UploadSession.id)).filter(UploadSession.url == url),
+        )
+        return sum(query.scalar() for query in queries)
+
+    def delete_file(self, url: str) -> bool:
+        """Remove the blob behind *url* and its variants if nothing references it.
+
+        Call after committing the deletion of the rows that used it. A blob
+        just reused by another upload stays until its lease runs out; the
+        ``uploads gc`` command sweeps it then if no row claimed it.
+        """
+        path = self.local_path(url)
+        if not path or not os.path.exists(path) or self.reference_count(url):
+            return False
+        if os.path.getmtime(path) > time.time():
+            return False
+        for variant in glob.glob(glob.escape(os.path.splitext(path)[0]) + ".w*.webp"):
+            os.remove(variant)
+        return super().delete_file(url)
+
+    def referenced_names(self) -> set:
+        """File names of every upload still referenced by a row."""
+        urls = (
+            db.session.query(Image.url).filter(self._image_refs()).distinct().union(
+                db.session.query(Video.video_url).filter(self._video_refs()).distinct(),
+                db.session.query(UploadSession.url).filter(UploadSession.url.isnot(None)),
+            )
+        )
+        return {url.rsplit("/", 1)[-1] for (url,) in urls if url and url.startswith("/uploads/")}
+
+    def collect_garbage(self, min_age: timedelta, dry_run: bool = False) -> list:
+        """Delete files no row references, older than *min_age*; return their paths.
+
+        This also sweeps uploads orphaned before reference counting existed
+        and temporary files left by interrupted uploads.
+        """
+        referenced = self.referenced_names()
+        stems = {os.path.splitext(name)[0] for name in referenced}
+        cutoff = time.time() - min_age.total_seconds()
+        removed = []
+        for root, _dirs, files in os.walk(self._ensure_upload_dir()):
+            for name in files:
+                variant = VARIANT_PATTERN.search(name)
+                if name in referenced or (variant and name[: variant.start()] in stems):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                    if not dry_run:
+                        os.remove(path)
+                except OSError:
+                    continue
+                removed.append(path)
+        return removed
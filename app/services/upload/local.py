@@ -1,12 +1,30 @@
+import hashlib
+import mimetypes
 import os
+import shutil
+import time
 import uuid
+from urllib.parse import quote
+
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-from flask import current_app
+from flask import current_app, send_file
 
-from .base import UploadService
+from .base import VARIANT_PATTERN, UploadService
 
 
 class LocalUploadService(UploadService):
+    """Files under ``UPLOAD_FOLDER``, served at ``/uploads/<name>``.
+
+    With ``UPLOAD_SHARD_DEPTH`` set, a file lives ``depth`` levels of two hex
+    characters deep (``ab/cd/<name>``), derived from a hash of its name, so
+    no directory grows past a few thousand entries. URLs don't include the
+    shard directories. Resized variants share their original's shard.
+    Files not moved yet by ``migrate_to_shards`` are still found at the top
+    level.
+    """
+
     def __init__(self):
         # Avoid touching current_app at import time; defer to method calls
         pass
@@ -21,32 +39,133 @@ class LocalUploadService(UploadService):
         if not file_storage or not getattr(file_storage, "filename", ""):
             return False, ""
 
-        upload_folder = self._ensure_upload_dir()
-
-        # Generate a safe, semi-unique filename to avoid collisions
-        original = secure_filename(file_storage.filename)
-        name, ext = os.path.splitext(original)
-        unique_name = f"{name}-{uuid.uuid4().hex[:8]}{ext}"
-        file_path = os.path.join(upload_folder, unique_name)
+        self._ensure_upload_dir()
+        unique_name = self._unique_name(file_storage.filename)
+        file_path = self._new_path(unique_name)
 
         file_storage.save(file_path)
         # The app exposes uploads at /uploads/<filename>
         return True, f"/uploads/{unique_name}"
 
+    def store_file(self, path: str, filename: str) -> str:
+        self._ensure_upload_dir()
+        unique_name = self._unique_name(filename)
+        shutil.move(path, self._new_path(unique_name))
+        return f"/uploads/{unique_name}"
+
+    def _new_path(self, name: str) -> str:
+        path = self.resolve(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def partial_path(self, upload_id: str) -> str:
+        return os.path.join(current_app.config["UPLOAD_SESSION_FOLDER"], f"{upload_id}.part")
+
+    @staticmethod
+    def _unique_name(filename: str) -> str:
+        # Generate a safe, semi-unique filename to avoid collisions
+        name, ext = os.path.splitext(secure_filename(filename))
+        return f"{name}-{uuid.uuid4().hex[:8]}{ext}"
+
     def delete_file(self, url: str) -> bool:
-        if not url:
-            return False
-        # Expect urls like /uploads/<filename>
-        prefix = "/uploads/"
-        if not url.startswith(prefix):
-            return False
-        filename = url[len(prefix) :]
-        upload_folder = current_app.config.get("UPLOAD_FOLDER")
-        file_path = os.path.join(upload_folder, filename)
-        if os.path.exists(file_path):
+        file_path = self.local_path(url)
+        if file_path and os.path.exists(file_path):
             try:
                 os.remove(file_path)
                 return True
             except OSError:
                 return False
         return False
+
+    def local_path(self, url: str):
+        # Expect urls like /uploads/<filename>
+        prefix = "/uploads/"
+        if not url or not url.startswith(prefix):
+            return None
+        return self.resolve(url[len(prefix) :])
+
+    @staticmethod
+    def shard_dirs(name: str, depth: int) -> list:
+        # Variants hash like their original, so they land in the same directory
+        variant = VARIANT_PATTERN.search(name)
+        key = name[: variant.start()] if variant else os.path.splitext(name)[0]
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return [digest[2 * level : 2 * level + 2] for level in range(depth)]
+
+    def resolve(self, filename: str):
+        """Path of upload *filename*, or where a new one goes; None if unsafe."""
+        folder = current_app.config.get("UPLOAD_FOLDER")
+        flat = safe_join(folder, filename)
+        depth = current_app.config.get("UPLOAD_SHARD_DEPTH", 0)
+        if flat is None or not depth or "/" in filename:
+            return flat
+        sharded = os.path.join(folder, *self.shard_dirs(filename, depth), filename)
+        # Checked in this order, a file moved by migrate_to_shards meanwhile is still found
+        if os.path.exists(sharded) or not os.path.exists(flat):
+            return sharded
+        return flat
+
+    def migrate_to_shards(self, batch_size: int = 500, pause: float = 0.0, progress=None) -> int:
+        """Move top-level files into their shard directories; return how many moved.
+
+        Safe while the app serves traffic: each move is an atomic rename and
+        ``resolve`` finds a file on either side of it. Sleeping *pause*
+        seconds every *batch_size* files keeps the I/O from starving requests.
+        """
+        folder = self._ensure_upload_dir()
+        depth = current_app.config.get("UPLOAD_SHARD_DEPTH", 0)
+        if not depth:
+            return 0
+        moved = 0
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                # dotfiles and .tmp files are uploads or variants being written
+                if entry.name.startswith(".") or entry.name.endswith(".tmp") or not entry.is_file():
+                    continue
+                target_dir = os.path.join(folder, *self.shard_dirs(entry.name, depth))
+                os.makedirs(target_dir, exist_ok=True)
+                try:
+                    os.replace(entry.path, os.path.join(target_dir, entry.name))
+                except FileNotFoundError:
+                    continue
+                moved += 1
+                if moved % batch_size == 0:
+                    if progress:
+                        progress(moved)
+                    time.sleep(pause)
+        return moved
+
+    def serve(self, filename: str):
+        """Serve an upload with immutable caching.
+
+        By default the file is streamed from Python with conditional and
+        Range support (video seeking answers 206). With ``UPLOAD_SENDFILE``
+        set, the response only names the file and the front server streams
+        it, so workers are never tied up by large media.
+        """
+        config = current_app.config
+        path = self.resolve(filename)
+        if path is None or not os.path.isfile(path):
+            raise NotFound()
+
+        max_age = config.get("UPLOAD_CACHE_MAX_AGE", 365 * 24 * 3600)
+        mode = config.get("UPLOAD_SENDFILE")
+        if mode == "x-accel-redirect":
+            response = current_app.response_class(mimetype=self._mimetype(path))
+            relative = os.path.relpath(path, config["UPLOAD_FOLDER"]).replace(os.sep, "/")
+            response.headers["X-Accel-Redirect"] = config["UPLOAD_ACCEL_PREFIX"].rstrip("/") + "/" + quote(relative)
+        elif mode == "x-sendfile":
+            response = current_app.response_class(mimetype=self._mimetype(path))
+            response.headers["X-Sendfile"] = os.path.abspath(path)
+        else:
+            response = send_file(path, conditional=True, etag=True, max_age=max_age)
+
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.cache_control.immutable = True
+        return response
+
+    @staticmethod
+    def _mimetype(path: str) -> str:
+        return mimetypes.guess_type(path)[0] or "application/octet-stream"
@@ -0,0 +1,107 @@
+"""Data versions behind the explore and feed ETags.
+
+Listing pages used to derive their validators from ``COUNT(*)`` and
+``MAX(updated_at)`` over ``recipes`` and ``timeline``, i.e. two table scans
+per request even when the answer was a 304. Instead, every transaction that
+writes one of the tracked tables bumps the matching ``cache_versions`` row
+just before it commits, and the validators read those rows by primary key.
+
+Writes are picked up from ORM flushes and from bulk ``UPDATE``/``DELETE``/
+``INSERT`` statements run through the session (counters, timeline hooks),
+so write sites need no explicit calls. ``authors`` covers user names and
+avatars shown on recipe, post and comment cards.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.cache_version import CacheVersion
+from app.models.post import Post
+from app.models.recipe import Recipe
+from app.models.timeline import TimelineEntry
+from app.models.user import User
+from app.utils.db import insert_ignore
+
+CATALOGUE = "catalogue"
+TIMELINE = "timeline"
+AUTHORS = "authors"
+
+_TRACKED = {
+    Recipe.__table__.name: CATALOGUE,
+    Post.__table__.name: TIMELINE,
+    TimelineEntry.__table__.name: TIMELINE,
+    User.__table__.name: AUTHORS,
+}
+
+_PENDING_KEY = "pending_versions"
+
+
+def ensure_versions() -> None:
+    """Create the version rows so bumps can be a single ``UPDATE``."""
+    insert_ignore(CacheVersion, [{"name": name, "version": 0} for name in set(_TRACKED.values())], ["name"])
+    db.session.commit()
+
+
+def version_validators(*names: str) -> Tuple[tuple, datetime | None]:
+    """``(etag_parts, last_modified)`` for the given version rows, in one query."""
+    rows = {
+        row.name: row
+        for row in db.session.query(CacheVersion.name, CacheVersion.version, CacheVersion.updated_at)
+        .filter(CacheVersion.name.in_(names))
+    }
+    parts = tuple(rows[name].version if name in rows else 0 for name in names)
+    stamps = [row.updated_at for row in rows.values() if row.updated_at is not None]
+    return parts, max(stamps) if stamps else None
+
+
+def _mark(session: Session, names: Iterable[str]) -> None:
+    session.info.setdefault(_PENDING_KEY, set()).update(names)
+
+
+def _after_flush(session, flush_context):
+    changed = list(session.new) + list(session.deleted)
+    changed += [obj for obj in session.dirty if session.is_modified(obj)]
+    names = (_TRACKED.get(getattr(obj, "__tablename__", None)) for obj in changed)
+    _mark(session, (name for name in names if name is not None))
+
+
+def _do_orm_execute(state):
+    if not (state.is_update or state.is_delete or state.is_insert):
+        return
+    table = getattr(state.statement, "table", None)
+    name = _TRACKED.get(getattr(table, "name", None))
+    if name is not None:
+        _mark(state.session, (name,))
+
+
+def _before_commit(session):
+    # Flush first: the commit's own flush runs after this hook
+    session.flush()
+    names = session.info.pop(_PENDING_KEY, None)
+    if names:
+        session.execute(
+            CacheVersion.__table__.update()
+            .where(CacheVersion.name.in_(sorted(names)))
+            .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+        )
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_version_tracking() -> None:
+    """Attach the bump hooks to every session (idempotent)."""
+    for name, listener in (
+        ("after_flush", _after_flush),
+        ("do_orm_execute", _do_orm_execute),
+        ("before_commit", _before_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -0,0 +1,46 @@
+// Resumable chunked uploads against the /upload-sessions endpoints.
+//
+// uploadInChunks(file, options) opens an upload session, PUTs the file in
+// the chunk size the server asks for, resumes from the server's offset after
+// a conflict or a network error, and resolves with the upload id to submit
+// with the form, or null if options.cancelled() turned true meanwhile.
+//
+// options: sessionsUrl, csrfToken, kind, onProgress(percent), cancelled()
+async function uploadInChunks(file, { sessionsUrl, csrfToken, kind, onProgress = () => {}, cancelled = () => false }) {
+  const csrf = { 'X-CSRFToken': csrfToken };
+  let resp = await fetch(sessionsUrl, {
+    method: 'POST',
+    headers: { ...csrf, 'Content-Type': 'application/json' },
+    body: JSON.stringify({ filename: file.name, size: file.size, kind }),
+  });
+  const upload = await resp.json();
+  if (!resp.ok || !upload.success) throw new Error(upload.message || 'Could not start the upload');
+  const url = `${sessionsUrl}/${upload.upload_id}`;
+  let offset = upload.offset, failures = 0;
+  while (offset < file.size) {
+    if (cancelled()) return null;
+    try {
+      resp = await fetch(url, {
+        method: 'PUT',
+        headers: { ...csrf, 'Content-Type': 'application/octet-stream', 'Upload-Offset': String(offset) },
+        body: file.slice(offset, offset + upload.chunk_size),
+      });
+      const chunk = await resp.json();
+      // 409 carries the offset the server expects next
+      if (!resp.ok && resp.status !== 409) throw new Error(chunk.message || 'Upload failed');
+      if (resp.ok) failures = 0;
+      else if (++failures > 5) throw new Error(chunk.message);
+      offset = chunk.offset;
+    } catch (err) {
+      if (++failures > 5) throw err;
+      await new Promise(r => setTimeout(r, 1000 * failures));
+      const status = await fetch(url).then(r => r.json()).catch(() => null);
+      if (status && status.success) offset = status.offset;
+    }
+    onProgress(Math.round(100 * offset / file.size));
+  }
+  resp = await fetch(`${url}/complete`, { method: 'POST', headers: csrf });
+  const done = await resp.json();
+  if (!resp.ok || !done.success) throw new Error(done.message || 'Could not finish the upload');
+  return cancelled() ? null : done.upload_id;
+}
@@ -0,0 +1,369 @@
+"""Application cache with pluggable backends.
+
+``cache`` (see ``app.extensions``) is configured from the app config:
+
+- ``CACHE_BACKEND``: ``memory`` (per-process TTL + LRU, the default),
+  ``sqlite`` (a file shared by every worker on the host), ``redis`` (any
+  Redis-protocol server, needs the ``redis`` package) or ``null`` (disabled).
+- ``CACHE_URL``: the SQLite file path or the Redis URL.
+- ``CACHE_DEFAULT_TTL``, ``CACHE_MAX_ENTRIES``, ``CACHE_KEY_PREFIX``.
+
+``get_or_set`` and ``@cache.memoize`` are single-flight: concurrent misses
+on one key wait for the first caller's result instead of all recomputing it,
+within a worker through an in-process lock and across workers (shared
+backends only) through a short-lived lock key. Values must be picklable for
+the shared backends; never cache ORM instances. Backend failures are counted
+and treated as misses, so an unreachable cache server degrades to no cache.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+MISSING = object()
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 10000
+LOCK_TIMEOUT = 10.0
+POLL_INTERVAL = 0.05
+
+
+class NullBackend:
+    shared = False
+
+    def get(self, key):
+        return MISSING
+
+    def set(self, key, value, ttl):
+        pass
+
+    def add(self, key, value, ttl) -> bool:
+        return True
+
+    def delete(self, key):
+        pass
+
+    def clear(self, prefix):
+        pass
+
+
+class MemoryBackend:
+    """Per-process store: entries expire after their TTL and the least
+    recently used ones are evicted beyond ``max_entries``."""
+
+    shared = False
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def add(self, key, value, ttl) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                return False
+            self._entries[key] = (time.monotonic() + ttl if ttl else None, value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+
+class SQLiteBackend:
+    """A SQLite file shared by the workers of one host (WAL mode, one
+    connection per thread). Expired rows are purged every few hundred writes."""
+
+    shared = True
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL) WITHOUT ROWID"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return MISSING if row is None else pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time() + ttl if ttl else None),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def add(self, key, value, ttl) -> bool:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value), now + ttl if ttl else None),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self, prefix):
+        self._conn().execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+class RedisBackend:
+    """Any Redis-protocol server; requires the optional ``redis`` package."""
+
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(key)
+        return MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key, value, ttl) -> bool:
+        return bool(self._client.set(key, pickle.dumps(value), px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def clear(self, prefix):
+        keys = list(self._client.scan_iter(match=f"{prefix}*", count=500))
+        for start in range(0, len(keys), 500):
+            self._client.delete(*keys[start:start + 500])
+
+
+class Cache:
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.default_ttl = DEFAULT_TTL
+        self.prefix = "odigo:"
+        self._flights: Dict[str, threading.Event] = {}
+        self._flights_lock = threading.Lock()
+        self._stats = dict.fromkeys(("hits", "misses", "sets", "waits", "errors"), 0)
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        kind = config.get("CACHE_BACKEND", "memory")
+        url = config.get("CACHE_URL")
+        if kind == "memory":
+            self.backend = MemoryBackend(config.get("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        elif kind == "sqlite":
+            self.backend = SQLiteBackend(url or os.path.join(app.instance_path, "cache.sqlite"))
+        elif kind == "redis":
+            self.backend = RedisBackend(url or "redis://localhost:6379/0")
+        elif kind == "null":
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND {kind!r}")
+        self.default_ttl = config.get("CACHE_DEFAULT_TTL", DEFAULT_TTL)
+        self.prefix = config.get("CACHE_KEY_PREFIX", self.prefix)
+        app.extensions["cache"] = self
+
+    # -- statistics -------------------------------------------------------
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of this worker since start (or ``reset_stats``)."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["backend"] = type(self.backend).__name__
+        stats["evictions"] = getattr(self.backend, "evictions", None)
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+    # -- basic operations -------------------------------------------------
+
+    def _ttl(self, ttl):
+        return self.default_ttl if ttl is None else ttl
+
+    def _get(self, key):
+        try:
+            return self.backend.get(self.prefix + key)
+        except Exception:
+            self._count("errors")
+            return MISSING
+
+    def get(self, key: str, default=None):
+        value = self._get(key)
+        self._count("misses" if value is MISSING else "hits")
+        return default if value is MISSING else value
+
+    def set(self, key: str, value, ttl: float | None = None) -> None:
+        """Store *value*; a *ttl* of 0 keeps it until evicted or deleted."""
+        try:
+            self.backend.set(self.prefix + key, value, self._ttl(ttl))
+            self._count("sets")
+        except Exception:
+            self._count("errors")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self.prefix + key)
+        except Exception:
+            self._count("errors")
+
+    def clear(self) -> None:
+        """Drop every entry under this app's key prefix."""
+        self.backend.clear(self.prefix)
+
+    # -- single flight ----------------------------------------------------
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: float | None = None):
+        """Return the cached value for *key*, computing it with *factory* once on a miss."""
+        value = self._get(key)
+        if value is not MISSING:
+            self._count("hits")
+            return value
+        self._count("misses")
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = threading.Event()
+        if not leader:
+            self._count("waits")
+            flight.wait(LOCK_TIMEOUT)
+            value = self._get(key)
+            if value is not MISSING:
+                return value
+            return self._compute(key, factory, ttl)
+        try:
+            if self.backend.shared:
+                return self._shared_flight(key, factory, ttl)
+            return self._compute(key, factory, ttl)
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.set()
+
+    def _compute(self, key, factory, ttl):
+        value = factory()
+        self.set(key, value, ttl)
+        return value
+
+    def _shared_flight(self, key, factory, ttl):
+        lock_key = f"{self.prefix}lock:{key}"
+        try:
+            acquired = self.backend.add(lock_key, 1, LOCK_TIMEOUT)
+        except Exception:
+            self._count("errors")
+            acquired = True
+        if acquired:
+            try:
+                return self._compute(key, factory, ttl)
+            finally:
+                self.delete(f"lock:{key}")
+        # Another worker is computing it: wait for its result, up to the lock's lifetime
+        self._count("waits")
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            value = self._get(key)
+            if value is not MISSING:
+                return value
+        return self._compute(key, factory, ttl)
+
+    # -- decorators -------------------------------------------------------
+
+    def memoize(self, ttl: float | None = None, namespace: str | None = None):
+        """Cache a function's result per arguments.
+
+        Arguments are part of the key through their ``repr``, so they should
+        be plain values (ids, strings, numbers, dates). The wrapped function
+        gains ``invalidate(*args, **kwargs)`` to drop one entry.
+        """
+
+        def decorator(func):
+            name = namespace or f"{func.__module__}.{func.__qualname__}"
+
+            def make_key(args, kwargs):
+                raw = repr((args, sorted(kwargs.items())))
+                return f"memo:{name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.get_or_set(make_key(args, kwargs), lambda: func(*args, **kwargs), ttl)
+
+            wrapper.invalidate = lambda *args, **kwargs: self.delete(make_key(args, kwargs))
+            wrapper.uncached = func
+            return wrapper
+
+        return decorator
@@ -0,0 +1,17 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.extensions import db
+
+
+def insert_ignore(model, rows, index_elements):
+    """Insert *rows* into *model*'s table, skipping rows that hit the unique key.
+
+    Emits ``INSERT ... ON CONFLICT DO NOTHING`` on SQLite and PostgreSQL so
+    concurrent writers never fail on a duplicate.
+    """
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(model.__table__).values(rows).on_conflict_do_nothing(index_elements=index_elements)
+    db.session.execute(stmt)
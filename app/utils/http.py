@@ -0,0 +1,55 @@
+import hashlib
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+DEFAULT_CSRF_TIME_LIMIT = 3600
+
+
+def _etag(parts) -> str:
+    # The page embeds the user's name and a CSRF token, so both the identity
+    # and a time bucket shorter than the token's lifetime are part of the tag
+    limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", DEFAULT_CSRF_TIME_LIMIT) or DEFAULT_CSRF_TIME_LIMIT
+    user = (current_user.get_id(), getattr(current_user, "updated_at", None))
+    raw = repr((parts, user, int(time.time() // (limit / 2))))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional(validators):
+    """Answer ``If-None-Match`` with 304 before the view does any work.
+
+    *validators* is called with the view's arguments and returns
+    ``(etag_parts, last_modified)`` from cheap queries, or None to skip
+    (e.g. when the view is about to 404). Only GET/HEAD requests without
+    pending flash messages are conditional; their 200 responses carry a weak
+    ETag and ``Cache-Control: private, no-cache`` so browsers revalidate.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+                return view(*args, **kwargs)
+            result = validators(*args, **kwargs)
+            if result is None:
+                return view(*args, **kwargs)
+            parts, last_modified = result
+            etag = _etag(parts)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,82 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import DateTime, tuple_
+
+
+class KeysetPage:
+    """One page of a keyset (cursor) paginated query.
+
+    Unlike Flask-SQLAlchemy's ``Pagination`` there is no total or page count:
+    the page is fetched with ``WHERE (key, id) < cursor ... LIMIT n + 1`` so
+    every page costs the same regardless of how deep it is.
+    """
+
+    is_keyset = True
+    total = None
+
+    def __init__(self, items, per_page, cursor, next_cursor):
+        self.items = items
+        self.per_page = per_page
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return not self.cursor
+
+
+def keyset_requested() -> bool:
+    """Whether the current request should use cursor pagination."""
+    return bool(current_app.config.get("KEYSET_PAGINATION")) or "cursor" in request.args
+
+
+def encode_cursor(value, row_id) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, column):
+    """Return ``(value, id)`` from *cursor*, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        if isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        return value, int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+def keyset_paginate(query, column, id_column, descending, cursor, per_page) -> KeysetPage:
+    """Paginate *query* on ``(column, id_column)`` starting after *cursor*.
+
+    *query* must not be ordered yet; the ordering on the key is applied here.
+    """
+    key = tuple_(column, id_column)
+    position = decode_cursor(cursor, column)
+    if position is not None:
+        query = query.filter(key < tuple_(*position) if descending else key > tuple_(*position))
+    if descending:
+        query = query.order_by(column.desc(), id_column.desc())
+    else:
+        query = query.order_by(column.asc(), id_column.asc())
+
+    rows = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, column.key), getattr(last, id_column.key))
+    return KeysetPage(rows, per_page, cursor, next_cursor)
@@ -0,0 +1,28 @@
+"""Add recipe keyset pagination indexes
+
+Revision ID: 3b9e0c4d7a21
+Revises: 228034533a2c
+Create Date: 2026-10-18 09:12:04.511203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e0c4d7a21'
+down_revision = '228034533a2c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.create_index('ix_recipes_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_recipes_name_id', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.drop_index('ix_recipes_name_id')
+        batch_op.drop_index('ix_recipes_created_at_id')
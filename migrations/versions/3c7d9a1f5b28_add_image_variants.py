@@ -0,0 +1,27 @@
+"""Add the resized variants map to images
+
+Revision ID: 3c7d9a1f5b28
+Revises: 8e1f4b6a2d07
+Create Date: 2026-10-18 17:41:09.530214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7d9a1f5b28'
+down_revision = '8e1f4b6a2d07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing images get theirs from `flask images variants`
+    with op.batch_alter_table('images', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('images', schema=None) as batch_op:
+        batch_op.drop_column('variants')
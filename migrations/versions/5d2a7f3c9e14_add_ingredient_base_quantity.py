@@ -0,0 +1,28 @@
+"""Add normalized base quantity and unit to ingredients
+
+Revision ID: 5d2a7f3c9e14
+Revises: 3b9e0c4d7a21
+Create Date: 2026-10-18 11:40:27.318904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a7f3c9e14'
+down_revision = '3b9e0c4d7a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ingredients', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('base_quantity', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('base_unit', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('ingredients', schema=None) as batch_op:
+        batch_op.drop_column('base_unit')
+        batch_op.drop_column('base_quantity')
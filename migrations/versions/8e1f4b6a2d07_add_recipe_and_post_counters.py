@@ -0,0 +1,56 @@
+"""Add denormalized comment, favorite, image, step and ingredient counters
+
+Revision ID: 8e1f4b6a2d07
+Revises: 5d2a7f3c9e14
+Create Date: 2026-10-18 15:02:44.190736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e1f4b6a2d07'
+down_revision = '5d2a7f3c9e14'
+branch_labels = None
+depends_on = None
+
+RECIPE_COUNTERS = ('comment_count', 'favorite_count', 'image_count', 'step_count', 'ingredient_count')
+POST_COUNTERS = ('comment_count', 'image_count')
+CHILDREN = {
+    'comment_count': 'comments',
+    'favorite_count': 'favorites',
+    'image_count': 'images',
+    'step_count': 'steps',
+    'ingredient_count': 'ingredients',
+}
+
+
+def upgrade():
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        for name in RECIPE_COUNTERS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        for name in POST_COUNTERS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from the child tables
+    for name in RECIPE_COUNTERS:
+        op.execute(
+            f"UPDATE recipes SET {name} = "
+            f"(SELECT count(*) FROM {CHILDREN[name]} WHERE {CHILDREN[name]}.recipe_id = recipes.id)"
+        )
+    for name in POST_COUNTERS:
+        op.execute(
+            f"UPDATE posts SET {name} = "
+            f"(SELECT count(*) FROM {CHILDREN[name]} WHERE {CHILDREN[name]}.post_id = posts.id)"
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        for name in reversed(POST_COUNTERS):
+            batch_op.drop_column(name)
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        for name in reversed(RECIPE_COUNTERS):
+            batch_op.drop_column(name)
@@ -0,0 +1,30 @@
+"""Index image and video urls for blob reference counting
+
+Revision ID: a41e6c2d8f93
+Revises: 3c7d9a1f5b28
+Create Date: 2026-10-18 20:52:17.804419
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41e6c2d8f93'
+down_revision = '3c7d9a1f5b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('images', schema=None) as batch_op:
+        batch_op.create_index('ix_images_url', ['url'], unique=False)
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.create_index('ix_videos_video_url', ['video_url'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.drop_index('ix_videos_video_url')
+    with op.batch_alter_table('images', schema=None) as batch_op:
+        batch_op.drop_index('ix_images_url')
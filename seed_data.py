@@ -14,6 +14,7 @@ from app import create_app
 from app.extensions import db
 from app.models.category import Category
 from app.models.origin import Origin
+from app.services.reference_data import bump_reference_version
 
 
 def create_categories():
@@ -208,7 +209,9 @@ def main():
             print("-" * 50)
             created_origins = create_origins()
 
-            # Commit all changes
+            # Commit all changes, telling running workers to reload their lookup cache
+            if created_categories or created_origins:
+                bump_reference_version()
             db.session.commit()
 
             print("\n" + "=" * 60)
@@ -0,0 +1,38 @@
+import pytest
+
+from app import create_app
+from app.core import config
+from app.extensions import db
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path}/app.db")
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    monkeypatch.setattr(config, "UPLOAD_SESSION_FOLDER", str(tmp_path / "upload-sessions"))
+    monkeypatch.setattr(config, "NUTRITION_DB_PATH", str(tmp_path / "nutrition.sqlite"))
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def user(app):
+    from app.models.user import User
+
+    user = User(email="cook@example.com", name="cook")
+    user.set_password("secret")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+        session["_fresh"] = True
+    return client
@@ -0,0 +1,14 @@
+from app.services.food_db import FoodMatcher, food_db
+
+
+def test_matcher_prefers_longest_then_leftmost_alias():
+    matcher = FoodMatcher([("potato",), ("sweet", "potato"), ("leaf",), ("pea",)])
+
+    assert matcher.longest_match(["sweet", "potato", "leaf"]) == ("sweet", "potato")
+    assert matcher.longest_match(["leaf", "and", "potato"]) == ("leaf",)
+    assert matcher.longest_match(["peanut", "butter"]) is None
+
+
+def test_lookup_resolves_through_the_compiled_aliases(app):
+    assert food_db.lookup("Sweet potatoes, diced").name == "sweet potato"
+    assert food_db.lookup("something unknown") is None
@@ -0,0 +1,44 @@
+import pytest
+
+from app.extensions import db
+from app.models.recipe import Recipe
+from app.models.user import User
+from app.services.counters import increment
+
+
+@pytest.fixture
+def author(app):
+    author = User(email="chef@example.com", name="chef")
+    author.set_password("secret")
+    db.session.add(author)
+    db.session.flush()
+    db.session.add(Recipe(name="Jollof rice", public=True, user_id=author.id))
+    db.session.commit()
+    return author
+
+
+def revalidate(client, path):
+    etag = client.get(path).headers["ETag"]
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+    return etag
+
+
+def test_explore_etag_changes_when_an_author_is_renamed(client, author):
+    etag = revalidate(client, "/dashboard/explore")
+
+    author.name = "head chef"
+    db.session.commit()
+
+    response = client.get("/dashboard/explore", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert b"head chef" in response.data
+
+
+def test_feed_etag_changes_on_bulk_counter_updates(client, author):
+    recipe = Recipe.query.filter_by(user_id=author.id).one()
+    etag = revalidate(client, "/feed/")
+
+    increment(Recipe, recipe.id, "comment_count")
+    db.session.commit()
+
+    assert client.get("/feed/", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,21 @@
+from app.extensions import cache, db
+from app.models.ingredients import Ingredient
+from app.models.recipe import Recipe
+from app.services.nutrition import public_macro_matrix, top_recipes_for_goal
+
+
+def test_recipe_made_private_within_the_ranking_ttl_is_listed_once(app, user):
+    public_macro_matrix.invalidate()
+    cache.clear()
+    recipe = Recipe(name="Grilled chicken", public=True, user_id=user.id)
+    db.session.add(recipe)
+    db.session.flush()
+    db.session.add(Ingredient(name="chicken", quantity=200, unit="g", recipe_id=recipe.id, user_id=user.id))
+    db.session.commit()
+    assert [r.id for r, _ in top_recipes_for_goal(user.id, "high_protein")] == [recipe.id]
+
+    # The cached public ranking still lists it; the owner's private matrix now does too
+    recipe.public = False
+    db.session.commit()
+
+    assert [r.id for r, _ in top_recipes_for_goal(user.id, "high_protein")] == [recipe.id]
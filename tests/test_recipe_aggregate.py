@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models.comment import Comment
+from app.models.image import Image
+from app.models.ingredients import Ingredient
+from app.models.recipe import Recipe
+from app.models.step import Step
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def make_recipe(user, children: int) -> int:
+    recipe = Recipe(name=f"Recipe with {children}", public=True, user_id=user.id)
+    db.session.add(recipe)
+    db.session.flush()
+    for i in range(children):
+        ingredient = Ingredient(name=f"ingredient {i}", recipe_id=recipe.id, user_id=user.id)
+        step = Step(step_number=i + 1, instruction=f"step {i}", recipe_id=recipe.id)
+        db.session.add_all([ingredient, step])
+        db.session.flush()
+        db.session.add_all([
+            Image(url=f"/uploads/r{recipe.id}-{i}.jpg", recipe_id=recipe.id),
+            Image(url=f"/uploads/i{recipe.id}-{i}.jpg", ingredient_id=ingredient.id),
+            Image(url=f"/uploads/s{recipe.id}-{i}.jpg", step_id=step.id),
+            Comment(content=f"comment {i}", recipe_id=recipe.id, user_id=user.id),
+        ])
+    db.session.commit()
+    return recipe.id
+
+
+def render_query_count(client, recipe_id: int) -> int:
+    client.get(f"/dashboard/recipe/{recipe_id}")  # warm per-worker caches
+    db.session.expire_all()
+    with count_queries() as statements:
+        response = client.get(f"/dashboard/recipe/{recipe_id}")
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_recipe_detail_query_count_does_not_grow_with_children(client, user):
+    one = make_recipe(user, 1)
+    many = make_recipe(user, 8)
+
+    assert render_query_count(client, one) == render_query_count(client, many)
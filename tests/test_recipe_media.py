@@ -0,0 +1,112 @@
+import io
+import os
+
+import pytest
+
+from app.extensions import db
+from app.models.image import Image
+from app.models.ingredients import Ingredient
+from app.models.recipe import Recipe
+from app.models.step import Step
+from app.models.video import Video
+from app.services.upload import upload_service
+
+
+@pytest.fixture(autouse=True)
+def no_variants(monkeypatch):
+    # The bytes below aren't real images; keep the process pool out of it
+    monkeypatch.setattr("app.blueprints.dashboard.views.generate_variants", lambda images: None)
+
+
+def file(content: bytes, name: str):
+    return (io.BytesIO(content), name)
+
+
+def edit_form(**fields):
+    return {
+        "name": "Renamed dish",
+        "public": "y",
+        "category_id": "0",
+        "origin_id": "0",
+        "ingredients-0-name": "egg",
+        "steps-0-step_number": "1",
+        "steps-0-instruction": "Boil",
+        "ingredient_names[]": ["egg"],
+        "step_numbers[]": ["1"],
+        "step_instructions[]": ["Boil"],
+        **fields,
+    }
+
+
+@pytest.fixture
+def recipe(client):
+    form = {
+        "name": "Boiled egg",
+        "public": "y",
+        "category_id": "0",
+        "origin_id": "0",
+        "ingredients-0-name": "egg",
+        "ingredients-0-images": [file(b"ingredient image", "egg.jpg")],
+        "steps-0-step_number": "1",
+        "steps-0-instruction": "Boil",
+        "steps-0-images": [file(b"step image", "pot.jpg")],
+        "recipe_images": [file(b"recipe image", "dish.jpg")],
+        "recipe_video": file(b"recipe video", "clip.mp4"),
+    }
+    assert client.post("/dashboard/add-recipe", data=form, content_type="multipart/form-data").status_code == 302
+    return Recipe.query.one()
+
+
+def media_urls():
+    return sorted(url for (url,) in db.session.query(Image.url).union(db.session.query(Video.video_url)))
+
+
+def on_disk(url):
+    return os.path.isfile(upload_service.local_path(url))
+
+
+def test_edit_keeps_media_it_does_not_replace(client, recipe):
+    before = media_urls()
+    assert len(before) == 4
+
+    resp = client.post(f"/dashboard/recipe/{recipe.id}/edit", data=edit_form())
+    assert resp.status_code == 302
+    db.session.expire_all()
+
+    assert Recipe.query.one().name == "Renamed dish"
+    assert media_urls() == before
+    assert all(on_disk(url) for url in before)
+    ingredient, step = Ingredient.query.one(), Step.query.one()
+    assert [image.url for image in ingredient.images] and [image.url for image in step.images]
+
+
+def test_edit_releases_replaced_and_removed_media(client, recipe):
+    old_video = Video.query.one().video_url
+    step_image = Step.query.one().images[0].url
+
+    resp = client.post(
+        f"/dashboard/recipe/{recipe.id}/edit",
+        data=edit_form(**{
+            "step_numbers[]": ["2"],
+            "step_instructions[]": ["Peel"],
+            "recipe_video": file(b"another video", "clip.mp4"),
+        }),
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 302
+    db.session.expire_all()
+
+    assert Video.query.one().video_url != old_video
+    assert not on_disk(old_video)
+    assert not Step.query.one().images
+    assert not on_disk(step_image)
+    assert Ingredient.query.one().images
+
+
+def test_delete_releases_every_file(client, recipe):
+    urls = media_urls()
+
+    assert client.post(f"/dashboard/recipe/{recipe.id}/delete").status_code == 302
+
+    assert media_urls() == []
+    assert not any(on_disk(url) for url in urls)
@@ -0,0 +1,54 @@
+from app.extensions import db
+from app.models.recipe import Recipe
+from app.models.upload_session import UploadSession
+from app.models.video import Video
+
+
+def upload_in_chunks(client, data: bytes, chunk_size: int = 4) -> str:
+    resp = client.post("/upload-sessions", json={"filename": "clip.mp4", "size": len(data), "kind": "video"})
+    assert resp.status_code == 201
+    upload_id = resp.get_json()["upload_id"]
+    for offset in range(0, len(data), chunk_size):
+        resp = client.put(
+            f"/upload-sessions/{upload_id}",
+            data=data[offset : offset + chunk_size],
+            headers={"Upload-Offset": str(offset)},
+        )
+        assert resp.status_code == 200
+    resp = client.post(f"/upload-sessions/{upload_id}/complete")
+    assert resp.get_json()["complete"]
+    return upload_id
+
+
+def recipe_form(**fields):
+    return {
+        "name": "Ndolé",
+        "description": "",
+        "public": "y",
+        "category_id": "0",
+        "origin_id": "0",
+        "ingredients-0-name": "peanut",
+        "steps-0-step_number": "1",
+        "steps-0-instruction": "Simmer",
+        "ingredient_names[]": ["peanut"],
+        "step_instructions[]": ["Simmer"],
+        **fields,
+    }
+
+
+def test_chunked_video_is_attached_on_add_and_edit(app, client):
+    app.config["UPLOAD_CHUNK_SIZE"] = 4
+
+    upload_id = upload_in_chunks(client, b"first video bytes")
+    assert client.post("/dashboard/add-recipe", data=recipe_form(recipe_video_upload=upload_id)).status_code == 302
+    recipe = Recipe.query.one()
+    (video,) = Video.query.filter_by(recipe_id=recipe.id).all()
+    assert video.video_url.startswith("/uploads/")
+
+    upload_id = upload_in_chunks(client, b"second video bytes")
+    resp = client.post(f"/dashboard/recipe/{recipe.id}/edit", data=recipe_form(recipe_video_upload=upload_id))
+    assert resp.status_code == 302
+    db.session.expire_all()
+    (edited,) = Video.query.filter_by(recipe_id=recipe.id).all()
+    assert edited.video_url not in ("", video.video_url)
+    assert UploadSession.query.count() == 0
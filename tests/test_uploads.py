@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from app.services.upload import LocalUploadService
+
+
+@pytest.mark.parametrize(
+    "original, variant",
+    [
+        ("photo-1a2b3c4d.jpg", "photo-1a2b3c4d.w320.webp"),
+        ("my.photo-1a2b3c4d.jpg", "my.photo-1a2b3c4d.w320.webp"),
+        ("a.b.c.png", "a.b.c.w1280.webp"),
+    ],
+)
+def test_variants_shard_with_their_original(original, variant):
+    assert LocalUploadService.shard_dirs(variant, 2) == LocalUploadService.shard_dirs(original, 2)
+
+
+def test_migrated_dotted_variant_resolves_next_to_original(app):
+    service = LocalUploadService()
+    folder = service._ensure_upload_dir()
+    for name in ("my.photo-1a2b3c4d.jpg", "my.photo-1a2b3c4d.w320.webp"):
+        with open(os.path.join(folder, name), "wb") as fh:
+            fh.write(b"x")
+
+    assert service.migrate_to_shards() == 2
+    original = service.resolve("my.photo-1a2b3c4d.jpg")
+    variant = service.resolve("my.photo-1a2b3c4d.w320.webp")
+    assert os.path.isfile(original) and os.path.isfile(variant)
+    assert os.path.dirname(original) == os.path.dirname(variant) != folder